@@ -5,16 +5,18 @@
 # Two parameters can be tuned: COSINE_SIMILARITY_THRESHOLD = 0.75
 #                                     distance = damerau_levenshtein(word_normalized, candidate_normalized, max_distance=3)
 # Search Priority is set as province > district > ward
+# The constants below are defaults; AutocorrectConfig overrides them per Solution
+# (see `python -m benchmarks.Sweep` for their accuracy/latency trade-off)
 
 ####################################################################
-import time
+import threading
 from collections import Counter
 import math
 
-import editdistance
 import unicodedata
 
 from IndexAnalyzer import Trie
+from SymSpell import DeletionIndex
 
 # Define category ranking
 CATEGORY_PRIORITY = {"province": 1, "district": 2, "ward": 3}  # Lower number = higher priority
@@ -22,6 +24,9 @@ COSINE_SIMILARITY_THRESHOLD = 0.73  # If similarity < 0.7, return "null", the le
 MAX_VALID_EDIT_DISTANCE = 3
 COSINE_SIMILARITY_THRESHOLD_NUM = 0.85
 
+# Serializes the lazy index builds of get_deletion_index (e.g. for regional tries) between threads
+_index_lock = threading.Lock()
+
 # Cosine Similarity Function
 def cosine_similarity(s1, s2):
     vec1, vec2 = Counter(s1), Counter(s2)
@@ -31,22 +36,74 @@ def cosine_similarity(s1, s2):
     magnitude2 = math.sqrt(sum(vec2[x] ** 2 for x in vec2.keys()))
     return dot_product / (magnitude1 * magnitude2) if magnitude1 and magnitude2 else 0.0
 
-# Autocorrection with Category Priority, Damerau-Levenshtein Distance & Cosine Similarity Check
-def autocorrect(word_normalized, trie: Trie, category):
-    best_distance = float("inf")
-    matches = []
-    temp = unicodedata.normalize("NFKD", word_normalized)
+class AutocorrectConfig:
+    """Tuning constants of autocorrect, one instance per Solution."""
+
+    def __init__(self, cosine_threshold=COSINE_SIMILARITY_THRESHOLD,
+                 cosine_threshold_num=COSINE_SIMILARITY_THRESHOLD_NUM,
+                 max_edit_distance=MAX_VALID_EDIT_DISTANCE, prefilter=True):
+        self.cosine_threshold = cosine_threshold
+        self.cosine_threshold_num = cosine_threshold_num  # for segments containing digits
+        self.max_edit_distance = max_edit_distance
+        self.prefilter = prefilter  # reject hopeless segments before the edit-distance lookup
+
+    def __repr__(self):
+        return (f"AutocorrectConfig(cosine_threshold={self.cosine_threshold}, "
+                f"cosine_threshold_num={self.cosine_threshold_num}, max_edit_distance={self.max_edit_distance}, "
+                f"prefilter={self.prefilter})")
+
+DEFAULT_CONFIG = AutocorrectConfig()
+
+def build_deletion_index(trie: Trie, max_distance=MAX_VALID_EDIT_DISTANCE):
+    """Precompute the SymSpell deletion index used by autocorrect for this trie."""
+    trie.deletion_index = DeletionIndex(trie.all_words, max_distance, strings=trie.strings)
+    return trie.deletion_index
 
-    for candidate_normalized in trie.all_words:
+def get_deletion_index(trie: Trie, max_distance=MAX_VALID_EDIT_DISTANCE) -> DeletionIndex:
+    index = trie.deletion_index
+    if index is None or index.max_distance < max_distance:
+        with _index_lock:
+            index = trie.deletion_index
+            if index is None or index.max_distance < max_distance:
+                index = build_deletion_index(trie, max(max_distance, MAX_VALID_EDIT_DISTANCE))
+    return index
 
-        distance = editdistance.distance(temp, unicodedata.normalize("NFKD", candidate_normalized))
+def find_closest_words(word_normalized, trie: Trie, stats=None, max_distance=MAX_VALID_EDIT_DISTANCE):
+    """All words of the trie at the minimal edit distance (<= max_distance)."""
+    _, matches = get_deletion_index(trie, max_distance).lookup(word_normalized, max_distance, stats)
+    return matches
+
+def cannot_match(word_normalized, trie: Trie, config: "AutocorrectConfig") -> bool:
+    """
+    Lossless prefilter: True only if autocorrect is sure to return "" for this word,
+    because no word is within the edit distance (DeletionIndex.may_match) or because
+    no word can reach the cosine threshold (upper bound from DeletionIndex.char_weights).
+    """
+    if not word_normalized:
+        return False
+    index = get_deletion_index(trie, config.max_edit_distance)
+
+    counts = Counter(word_normalized)
+    weights = index.char_weights
+    bound = sum(count * weights.get(char, 0.0) for char, count in counts.items())
+    bound /= math.sqrt(sum(count * count for count in counts.values()))
+    threshold = config.cosine_threshold_num if any(char.isdigit() for char in word_normalized) else config.cosine_threshold
+    if bound < threshold - 1e-9:  # margin for float rounding in cosine_similarity
+        return True
+
+    return not index.may_match(unicodedata.normalize("NFKD", word_normalized), config.max_edit_distance)
+
+# Autocorrection with Category Priority, Damerau-Levenshtein Distance & Cosine Similarity Check
+def autocorrect(word_normalized, trie: Trie, category, stats=None, config: AutocorrectConfig = DEFAULT_CONFIG):
+    if config.prefilter and cannot_match(word_normalized, trie, config):
+        if stats is not None:
+            stats.prefiltered += 1
+        return ""
 
-        # Prioritize lower edit distance & higher-ranked category (Province > District > Ward)
-        if distance < min(best_distance, MAX_VALID_EDIT_DISTANCE):
-            matches = [candidate_normalized]
-            best_distance = distance
-        elif distance == min(best_distance, MAX_VALID_EDIT_DISTANCE):
-            matches.append(candidate_normalized)
+    matches = find_closest_words(word_normalized, trie, stats, config.max_edit_distance)
+    if stats is not None:
+        stats.autocorrect_calls += 1
+        stats.cosine_scored += len(matches)
 
     # Check Cosine Similarity Threshold
     best_match = ""
@@ -56,9 +113,9 @@ def autocorrect(word_normalized, trie: Trie, category):
 
         # Xác định ngưỡng phù hợp
         if any(char.isdigit() for char in word_normalized):
-            threshold = COSINE_SIMILARITY_THRESHOLD_NUM
+            threshold = config.cosine_threshold_num
         else:
-            threshold = COSINE_SIMILARITY_THRESHOLD
+            threshold = config.cosine_threshold
 
         # So sánh tương đồng
         if p > threshold and p > best_similarity:
@@ -0,0 +1,94 @@
+# Streaming command-line classifier
+# Reads JSONL records (or plain text lines) from a file or stdin and writes one JSONL
+# result per input line, in input order, as soon as it is ready. Input is consumed in
+# bounded windows, so memory stays flat however large the file is.
+#
+#   {"text": "P3, Mỹ Tho, T.Giang."}  ->  {"text": "...", "result": {"province": ..., "district": ..., "ward": ...}}
+#
+# Usage (from the repository root):
+#   python Classify.py addresses.jsonl -o results.jsonl [--workers 4] [--mode thread] [--chunksize 256]
+#   cat addresses.txt | python Classify.py - --format text > results.jsonl
+
+####################################################################
+import argparse
+import json
+import sys
+import time
+from collections import deque
+
+from Solution import Solution
+
+
+def read_records(lines, input_format: str, field: str):
+    """Yield (record, text) per input line. Unparsable lines carry an "error" and no text."""
+    for line_number, line in enumerate(lines, 1):
+        line = line.rstrip("\n")
+        if input_format == "text" or (input_format == "auto" and not line.lstrip().startswith("{")):
+            yield {"text": line}, line
+            continue
+        try:
+            record = json.loads(line)
+            yield record, str(record[field])
+        except (ValueError, KeyError, TypeError) as e:
+            yield {"line": line_number, "error": f"{type(e).__name__}: {e}"}, ""
+
+
+def classify_stream(solution: Solution, lines, output, input_format="auto", field="text",
+                    workers=1, chunksize=256, progress_every=5.0, mode=None):
+    pending = deque()
+
+    def texts():
+        for record, text in read_records(lines, input_format, field):
+            pending.append(record)
+            yield text
+
+    start = last_report = time.perf_counter()
+    count = 0
+    for result in solution.iter_batch(texts(), workers=workers, chunksize=chunksize, mode=mode):
+        record = pending.popleft()
+        if "error" not in record:
+            record["result"] = result
+        output.write(json.dumps(record, ensure_ascii=False) + "\n")
+        count += 1
+
+        now = time.perf_counter()
+        if progress_every and now - last_report >= progress_every:
+            last_report = now
+            print(f"{count} records, {count / (now - start):.0f} rec/s", file=sys.stderr, flush=True)
+
+    elapsed = time.perf_counter() - start
+    if progress_every:
+        print(f"Done: {count} records in {elapsed:.2f}s ({count / max(elapsed, 1e-9):.0f} rec/s)",
+              file=sys.stderr, flush=True)
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Classify addresses from a JSONL or text file, streaming")
+    parser.add_argument("input", help="input file, or - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="output JSONL file, or - for stdout")
+    parser.add_argument("--format", choices=["auto", "jsonl", "text"], default="auto",
+                        help="auto treats lines starting with { as JSON")
+    parser.add_argument("--field", default="text", help="JSON field holding the address")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes or threads")
+    parser.add_argument("--mode", choices=["process", "thread"],
+                        help="forked processes or threads (default: threads on free-threaded Python)")
+    parser.add_argument("--chunksize", type=int, default=256, help="addresses per worker task")
+    parser.add_argument("--progress-every", type=float, default=5.0, help="seconds between progress lines, 0 to disable")
+    args = parser.parse_args()
+
+    solution = Solution()
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        classify_stream(solution, source, output, args.format, args.field,
+                        args.workers, args.chunksize, args.progress_every, args.mode)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
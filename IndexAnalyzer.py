@@ -1,4 +1,10 @@
-from typing import Optional, Tuple, Dict, List
+import pickle
+import threading
+from array import array
+from collections import deque
+from functools import partial
+from typing import Callable, Optional, Tuple, Dict, List
+from StringTable import StringTable
 from Utils import *
 
 SPECIAL_CASES = ["xã", "x.", "huyện", "tỉnh", "t.",
@@ -10,35 +16,61 @@ DIGIT_CASES = {
     "district": ["q", "quận"],
 }
 
-# Dictionary to store generated variations for tracing back
-variation_map: Dict[str, dict] = {}
-
 province_short_form = {
     "hồchíminh":"hcm",
     "bàrịavũngtàu":"brvt",
 }
 
+# Categories whose reversed trie (names and acronym variants, see load_line) is kept
+# as Trie.reversed_trie for tail-anchored matching (Searcher.search_tail)
+REVERSED_INDEX_CATEGORIES = {"province"}
+
 class TrieNode:
     def __init__(self):
         self.children = {}
         self.is_end_of_word = False
         self.original_string: Optional[str] = None
+        # Aho-Corasick links, filled by Trie.build_automaton()
+        self.fail: Optional["TrieNode"] = None
+        self.outputs: List[str] = []
+
+    def __getstate__(self):
+        # Failure links point across the whole trie; they are cheap to rebuild and
+        # would make pickling recurse far deeper than the trie itself.
+        return self.children, self.is_end_of_word, self.original_string
+
+    def __setstate__(self, state):
+        self.children, self.is_end_of_word, self.original_string = state
+        self.fail = None
+        self.outputs = []
 
 
 class Trie:
 
-    def __init__(self):
+    def __init__(self, strings: Optional[StringTable] = None):
         self.root = TrieNode()
+        # Words, edge characters and the variants load_line derives are interned here
+        self.strings = strings
         self.all_words = set()
         self.original_names: Dict[str, str] = {}
+        self.automaton_ready = False
+        self.deletion_index = None  # SymSpell index, see Autocorrect.build_deletion_index
+        self.reversed_trie: Optional["Trie"] = None  # see REVERSED_INDEX_CATEGORIES
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.automaton_ready = False
 
     def insert(self, normalized_word: str):
         """Insert a normalized word into the trie with a reference to the original."""
+        strings = self.strings
+        if strings is not None:
+            normalized_word = strings.intern(normalized_word)
         node = self.root
         for i, char in enumerate(normalized_word):
 
             if char not in node.children:
-                node.children[char] = TrieNode()
+                node.children[char if strings is None else strings.intern(char)] = TrieNode()
 
             node = node.children[char]
 
@@ -46,18 +78,37 @@ class Trie:
         node.original_string = normalized_word
 
         self.all_words.add(normalized_word)
+        self.automaton_ready = False
+        self.deletion_index = None
 
     def insert_reversed(self, normalized_word: str):
+        strings = self.strings
+        if strings is not None:
+            normalized_word = strings.intern(normalized_word)
         node = self.root
         reversed_word = normalized_word[::-1]  # Đảo ngược chuỗi
         for char in reversed_word:
             if char not in node.children:
-                node.children[char] = TrieNode()
+                node.children[char if strings is None else strings.intern(char)] = TrieNode()
             node = node.children[char]
 
         node.is_end_of_word = True
         node.original_string = normalized_word  # Lưu chuỗi gốc, không phải chuỗi đảo ngược.
         self.all_words.add(normalized_word)
+        self.automaton_ready = False
+        self.deletion_index = None
+
+    def search_suffixes(self, text: str, end: int) -> List[Tuple[str, int, int]]:
+        """In a reversed trie: every word ending at text[end - 1], shortest first, walking backwards."""
+        node = self.root
+        result = []
+        for i in range(end - 1, -1, -1):
+            node = node.children.get(text[i])
+            if node is None:
+                break
+            if node.is_end_of_word:
+                result.append((node.original_string, i, end))
+        return result
 
     def search(self, text: str, start: int) -> Optional[Tuple[str, int, int]]:
         """Finds the first valid word from the given start index."""
@@ -110,8 +161,47 @@ class Trie:
 
         return result  # Return all matches
 
+    def build_automaton(self):
+        """Compile Aho-Corasick failure links over the existing trie nodes."""
+        root = self.root
+        root.fail = root
+        root.outputs = [root.original_string] if root.is_end_of_word else []
+        queue = deque()
+        for child in root.children.values():
+            child.fail = root
+            queue.append(child)
+
+        # BFS guarantees a node's failure target is complete before the node itself
+        while queue:
+            node = queue.popleft()
+            node.outputs = node.fail.outputs
+            if node.is_end_of_word:
+                node.outputs = [node.original_string] + node.outputs
+            for char, child in node.children.items():
+                fail = node.fail
+                while char not in fail.children and fail is not root:
+                    fail = fail.fail
+                child.fail = fail.children[char] if char in fail.children and fail.children[char] is not child else root
+                queue.append(child)
+
+        self.automaton_ready = True
+
+    def search_all(self, text: str) -> List[Tuple[str, int, int]]:
+        """Finds every (word, start, end) occurrence in one linear pass over the text."""
+        if not self.automaton_ready:
+            self.build_automaton()
+
+        root = self.root
+        node = root
+        result = []
+        for i, char in enumerate(text):
+            while char not in node.children and node is not root:
+                node = node.fail
+            node = node.children.get(char, root)
+            for word in node.outputs:
+                result.append((word, i + 1 - len(word), i + 1))
+        return result
 
-    
     def get_raw_text(self, normalized_text):
         return self.original_names.get(normalized_text, normalized_text)
 
@@ -134,13 +224,279 @@ class Trie:
         return candidates
 
 
-def generate_prefixed_variations(location_name: str, category: str) -> Tuple[List[str], List[str], str]:
+class CompactTrie:
+    """
+    Read-only trie packed into flat arrays, built from a loaded Trie.
+
+    Nodes are numbered breadth-first. The edges of node v are the positions
+    first_edge[v] .. first_edge[v + 1] - 1: labels holds their characters (one str,
+    searched with str.find) and targets their child nodes. terminal[v] is the id of
+    the word ending at v in words, or -1; with a StringTable, words is the table's
+    list and the ids are table ids. The Aho-Corasick links are arrays too:
+    fail[v] is the failure node and dict_link[v] the nearest terminal node on the
+    failure chain (or -1).
+    """
+
+    def __init__(self, trie: Trie):
+        self.all_words = trie.all_words
+        self.original_names = trie.original_names
+        self.deletion_index = trie.deletion_index
+        self.reversed_trie = CompactTrie(trie.reversed_trie) if trie.reversed_trie is not None else None
+        self.strings = trie.strings
+
+        self.words: List[str] = self.strings.strings if self.strings is not None else []
+        word_ids: Dict[str, int] = {}
+        self.first_edge = array("I")
+        self.targets = array("I")
+        self.terminal = array("i")
+        labels = []
+
+        nodes = [trie.root]
+        node_id = 0
+        while node_id < len(nodes):
+            node = nodes[node_id]
+            self.first_edge.append(len(labels))
+            for char, child in node.children.items():
+                labels.append(char)
+                self.targets.append(len(nodes))
+                nodes.append(child)
+            if node.is_end_of_word:
+                word = node.original_string
+                if self.strings is not None:
+                    word_id = self.strings.id(word)
+                else:
+                    word_id = word_ids.get(word)
+                    if word_id is None:
+                        word_id = word_ids[word] = len(self.words)
+                        self.words.append(word)
+                self.terminal.append(word_id)
+            else:
+                self.terminal.append(-1)
+            node_id += 1
+        self.first_edge.append(len(labels))
+        self.labels = "".join(labels)
+
+        self.build_automaton()
+
+    def __reduce__(self):
+        # Arrays go out as pickle buffers so a snapshot can map them from disk
+        state = {name: ((value.typecode, pickle.PickleBuffer(value)) if isinstance(value, array) else value)
+                 for name, value in self.__dict__.items()}
+        return _restore_compact_trie, (state,)
+
+    def child(self, node: int, char: str) -> int:
+        """Child of node along char, or -1."""
+        i = self.labels.find(char, self.first_edge[node], self.first_edge[node + 1])
+        return self.targets[i] if i >= 0 else -1
+
+    def build_automaton(self):
+        size = len(self.terminal)
+        self.fail = array("I", [0]) * size
+        self.dict_link = array("i", [-1]) * size
+
+        # Node ids are breadth-first, so failure targets are always complete first
+        for node in range(size):
+            for i in range(self.first_edge[node], self.first_edge[node + 1]):
+                char, child = self.labels[i], self.targets[i]
+                if node == 0:
+                    fail = 0
+                else:
+                    fail = self.fail[node]
+                    while fail != 0 and self.child(fail, char) < 0:
+                        fail = self.fail[fail]
+                    fail = max(self.child(fail, char), 0)
+                self.fail[child] = fail
+                self.dict_link[child] = fail if self.terminal[fail] >= 0 else self.dict_link[fail]
+
+    def search_suffixes(self, text: str, end: int) -> List[Tuple[str, int, int]]:
+        """In a reversed trie: every word ending at text[end - 1], shortest first, walking backwards."""
+        node = 0
+        result = []
+        for i in range(end - 1, -1, -1):
+            node = self.child(node, text[i])
+            if node < 0:
+                break
+            if self.terminal[node] >= 0:
+                result.append((self.words[self.terminal[node]], i, end))
+        return result
+
+    def search(self, text: str, start: int) -> Optional[Tuple[str, int, int]]:
+        """Finds the first valid word from the given start index."""
+        node = 0
+        for i in range(start, len(text)):
+            node = self.child(node, text[i])
+            if node < 0:
+                break
+            if self.terminal[node] >= 0:
+                return (self.words[self.terminal[node]], start, i + 1)
+        return None
+
+    def search_max_length(self, text: str, start: int) -> List[Tuple[str, int, int]]:
+        """Finds all valid words, including overlapping ones, without skipping characters."""
+        result = []
+        for i in range(start, len(text)):
+            node = 0
+            for j in range(i, len(text)):
+                node = self.child(node, text[j])
+                if node < 0:
+                    break
+                if self.terminal[node] >= 0:
+                    result.append((self.words[self.terminal[node]], i, j + 1))
+        return result
+
+    def search_all(self, text: str) -> List[Tuple[str, int, int]]:
+        """Finds every (word, start, end) occurrence in one linear pass over the text."""
+        # Same walk as Trie.search_all, with the lookups of child() inlined
+        labels, first_edge, targets = self.labels, self.first_edge, self.targets
+        fail, terminal, dict_link, words = self.fail, self.terminal, self.dict_link, self.words
+        node = 0
+        result = []
+        for i, char in enumerate(text):
+            while True:
+                edge = labels.find(char, first_edge[node], first_edge[node + 1])
+                if edge >= 0:
+                    node = targets[edge]
+                    break
+                if node == 0:
+                    break
+                node = fail[node]
+
+            output = node if terminal[node] >= 0 else dict_link[node]
+            while output >= 0:
+                word = words[terminal[output]]
+                result.append((word, i + 1 - len(word), i + 1))
+                output = dict_link[output]
+        return result
+
+    def get_raw_text(self, normalized_text):
+        return self.original_names.get(normalized_text, normalized_text)
+
+    def collect_candidates(self, search_key: str) -> List[Tuple[str, Optional[str]]]:
+        node = 0
+        for char in search_key:
+            node = self.child(node, char)
+            if node < 0:
+                return []
+
+        candidates = []
+        stack = [(node, search_key)]
+        while stack:
+            node, path = stack.pop()
+            if self.terminal[node] >= 0:
+                candidates.append((path, self.words[self.terminal[node]]))
+            # Push in reverse so children come out in insertion order, like Trie's DFS
+            for i in range(self.first_edge[node + 1] - 1, self.first_edge[node] - 1, -1):
+                stack.append((self.targets[i], path + self.labels[i]))
+        return candidates
+
+
+def _restore_compact_trie(state) -> CompactTrie:
+    trie = CompactTrie.__new__(CompactTrie)
+    for name, value in state.items():
+        if isinstance(value, tuple):
+            # Buffers come back as bytes or as read-only views over a memory-mapped file
+            typecode, buffer = value
+            value = memoryview(buffer).cast("B").cast(typecode)
+        setattr(trie, name, value)
+    return trie
+
+
+class LazyTrie:
+    """
+    Stands in for the trie returned by build(), which runs on first use (once, even
+    with concurrent readers); see Solution(lazy=True). Attribute reads and writes go
+    to the built trie, converted to a CompactTrie when compact is set.
+    """
+
+    def __init__(self, build: Callable[[], Trie], compact=False):
+        self._build = build
+        self._compact = compact
+        self._trie = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._trie is not None
+
+    def load(self):
+        trie = self._trie
+        if trie is None:
+            with self._lock:
+                if self._trie is None:
+                    built = self._build()
+                    self._trie = CompactTrie(built) if self._compact else built
+                    # Building interned new strings, which brought the table's lookup back
+                    if built.strings is not None:
+                        built.strings.seal()
+                trie = self._trie
+        return trie
+
+    def __getattr__(self, name):
+        return getattr(self.load(), name)
+
+    def __setattr__(self, name, value):
+        if name.startswith("_"):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self.load(), name, value)
+
+
+# Category bits of ExactIndex entries
+EXACT_CATEGORY_BITS = {"province": 1, "district": 2, "ward": 4}
+
+
+class ExactIndex:
+    """
+    Hash index from every indexed variant (normalized and accent-folded names, prefixed
+    forms and, for provinces, the acronyms of the reversed trie) to a bit set of the
+    categories it names, for the exact-match fast path (Searcher.search_exact). The
+    values are small shared ints; canonical names are then read from the tries.
+    Only the tries it was built from are answered from the index; any other trie
+    (a lazy one not built yet, a region, a version published by a live update) is
+    answered by its own word sets, see names_in.
+    """
+
+    def __init__(self, tries: Dict[str, Trie]):
+        self.entries: Dict[str, int] = {}
+        self.indexed: Dict[str, Trie] = {}
+        for category, bit in EXACT_CATEGORY_BITS.items():
+            trie = tries.get(category)
+            if trie is None or isinstance(trie, LazyTrie):
+                continue
+            self.indexed[category] = trie
+            words = [trie.all_words]
+            if category in REVERSED_INDEX_CATEGORIES and trie.reversed_trie is not None:
+                words.append(trie.reversed_trie.all_words)
+            for group in words:
+                for word in group:
+                    self.entries[word] = self.entries.get(word, 0) | bit
+
+    def __len__(self):
+        return len(self.entries)
+
+    def names(self, word: str, category: str, trie) -> bool:
+        """True if word, as a whole, is a variant of a name of category in trie."""
+        if self.indexed.get(category) is trie:
+            return bool(self.entries.get(word, 0) & EXACT_CATEGORY_BITS[category])
+        return names_in(trie, word, category)
+
+
+def names_in(trie, word: str, category: str) -> bool:
+    if word in trie.all_words:
+        return True
+    return category in REVERSED_INDEX_CATEGORIES and trie.reversed_trie is not None \
+        and word in trie.reversed_trie.all_words
+
+
+def generate_prefixed_variations(location_name: str, category: str,
+                                 variation_map: Optional[Dict[str, dict]] = None,
+                                 strings: Optional[StringTable] = None) -> Tuple[List[str], List[str], str]:
     """
     Generate basic prefixed variants and additional (acronym) variants.
+    The prefixed variants are recorded in variation_map[category][normalized name]
+    for tracing back, when a variation_map is given; all of them are interned in strings.
     """
     variations = []
-    if category not in variation_map:
-        variation_map[category] = {}
 
     normalized_name = normalize_text_but_keep_accent(location_name)
 
@@ -176,7 +532,12 @@ def generate_prefixed_variations(location_name: str, category: str) -> Tuple[Lis
         acronym_variants.extend(new_vars_non_accent)
     acronym_variants = list(set(acronym_variants))
 
-    variation_map[category][normalized_name] = variations
+    if strings is not None:
+        variations = strings.intern_all(variations)
+        acronym_variants = strings.intern_all(acronym_variants)
+        normalized_name = strings.intern(normalized_name)
+    if variation_map is not None:
+        variation_map.setdefault(category, {})[normalized_name] = variations
     return variations, acronym_variants, normalized_name
 
 
@@ -210,39 +571,107 @@ def generate_text_variants(raw_str):
     return list(set(variants))
 
 
-def load_databases(filenames: Dict[str, str],
-                   tries: Dict[str, Trie]) -> Tuple[Dict[str, Trie], Dict[str, Trie]]:
+def load_databases(filenames: Dict[str, str], tries: Dict[str, Trie],
+                   variation_map: Optional[Dict[str, dict]] = None,
+                   strings: Optional[StringTable] = None):
+    """Fill tries with the trie of each list file in filenames."""
     for category, filename in filenames.items():
-        trie = Trie()
-        reversed_trie = Trie()
-        try:
-            with open(filename, "r", encoding="utf-8") as file:
-                for line in file:
-                    load_line(line, trie, reversed_trie, category)
-            tries[category] = trie
-        except FileNotFoundError:
-            print(f"Warning: File {filename} not found!")
-            tries[category] = Trie()
-    return tries
-
-
-def load_line(line, trie, reversed_trie, category):
+        tries[category] = load_category(filename, category, variation_map, strings)
+
+
+def load_category(filename: str, category: str, variation_map: Optional[Dict[str, dict]] = None,
+                  strings: Optional[StringTable] = None) -> Trie:
+    """The trie of one list file (an empty one if the file is missing)."""
+    trie = Trie(strings)
+    reversed_trie = Trie(strings)
+    try:
+        with open(filename, "r", encoding="utf-8") as file:
+            for line in file:
+                load_line(line, trie, reversed_trie, category, variation_map)
+        trie.build_automaton()
+        if category in REVERSED_INDEX_CATEGORIES:
+            trie.reversed_trie = reversed_trie
+    except FileNotFoundError:
+        print(f"Warning: File {filename} not found!")
+        trie = Trie(strings)
+    return trie
+
+
+def region_key(raw_name: str) -> str:
+    return normalize_text_and_remove_accent(raw_name)
+
+
+def load_hierarchy(filename: str, lazy=False, compact=False,
+                   strings: Optional[StringTable] = None) -> Dict[str, Dict[Tuple[str, ...], Trie]]:
+    """
+    Build regional tries from a hierarchy file with one tab-separated
+    "province<TAB>district<TAB>ward" row per ward (ward may be empty for a district row).
+    Names are the raw names of the list files.
+
+    Returns {"district": {(province,): trie}, "ward": {(province,): trie, (province, district): trie}},
+    with parents keyed by region_key() so spelling variants of a name share one region.
+    With lazy, each regional trie is a LazyTrie (a CompactTrie once built, with compact)
+    and only built when its region is first searched.
+    """
+    children: Dict[str, Dict[Tuple[str, ...], List[str]]] = {"district": {}, "ward": {}}
+    with open(filename, "r", encoding="utf-8") as file:
+        for line in file:
+            if line.strip() == "" or line.startswith("#"):
+                continue
+            province, district, ward = (line.rstrip("\n").split("\t") + ["", ""])[:3]
+            province, district, ward = province.strip(), district.strip(), ward.strip()
+            province_key, district_key = region_key(province), region_key(district)
+            if province and district:
+                children["district"].setdefault((province_key,), []).append(district)
+            if province and ward:
+                children["ward"].setdefault((province_key,), []).append(ward)
+                if district:
+                    children["ward"].setdefault((province_key, district_key), []).append(ward)
+
+    regions: Dict[str, Dict[Tuple[str, ...], Trie]] = {"district": {}, "ward": {}}
+    for category, by_parent in children.items():
+        for parent, names in by_parent.items():
+            build = partial(build_region, names, category, strings)
+            regions[category][parent] = LazyTrie(build, compact) if lazy else build()
+    return regions
+
+
+def build_region(names: List[str], category: str, strings: Optional[StringTable] = None) -> Trie:
+    trie = Trie(strings)
+    reversed_trie = Trie(strings)
+    for name in dict.fromkeys(names):  # unique, in file order
+        load_line(name, trie, reversed_trie, category)
+    trie.build_automaton()
+    return trie
+
+
+def location_variants(location_name: str, category: str, variation_map: Optional[Dict[str, dict]] = None,
+                      strings: Optional[StringTable] = None) -> Tuple[List[str], List[str]]:
+    """(variants for the trie, variants for the reversed trie) of one location name, as load_line inserts them."""
+    # Generate the initial prefixed variants
+    prefixed_variations, acronym_variants, normalized_text = generate_prefixed_variations(location_name, category,
+                                                                                         variation_map, strings)
+
+    all_variants = []
+    for variant in prefixed_variations + acronym_variants:
+        if variant not in all_variants:
+            all_variants.append(variant)
+    return prefixed_variations, all_variants
+
+
+def load_line(line, trie, reversed_trie, category, variation_map=None):
     location_name = line.strip()
     if location_name == "":
         return
+    if trie.strings is not None:
+        location_name = trie.strings.intern(location_name)
 
-    # Generate the initial prefixed variants
-    prefixed_variations, acronym_variants, normalized_text = generate_prefixed_variations(location_name, category)
+    prefixed_variations, all_variants = location_variants(location_name, category, variation_map, trie.strings)
     # Insert original prefixed_variations into the regular trie
     for variant in prefixed_variations:
         trie.original_names[variant] = location_name
         trie.insert(variant)
 
-    all_variants = []
-    for variant in prefixed_variations + acronym_variants:
-        if variant not in all_variants:
-            all_variants.append(variant)
-
     # Insert the combined variants into the reversed trie using insert_reversed
     for variant in all_variants:
         trie.original_names[variant] = location_name
@@ -0,0 +1,188 @@
+# Joint lattice decoder, an alternative to the greedy cascade of Solution.process
+# All gazetteer variants of the three categories go into one Aho-Corasick trie, so a
+# single pass over the normalized address yields every candidate span of every
+# category. The spans form a lattice that is decoded with dynamic programming into the
+# best non-overlapping (ward, district, province) assignment, following the order
+# Vietnamese addresses are written in (ward, then district, then province, left to
+# right) and preferring spans that fill a whole comma segment, a province in the last
+# segment, names read as the higher level when they exist at several, and parts that
+# directly follow each other. Categories left empty go through the same autocorrect
+# fallback as the cascade.
+#
+# Live updates (LiveIndex.py) do not rebuild the automaton: LatticeDecoder.layered keeps
+# it and only indexes the words that changed.
+#
+# Select it with Solution(engine="lattice"); `python -m benchmarks.EngineBenchmark`
+# compares both engines for speed and accuracy.
+
+####################################################################
+from bisect import bisect_right
+from typing import Dict, List, Optional, Tuple
+
+from IndexAnalyzer import CompactTrie, Trie
+from LiveIndex import LayeredTrie
+
+CATEGORIES = ["ward", "district", "province"]  # reading order, left to right
+
+# Span score = matched characters + these priors
+SEGMENT_BONUS = 3        # the span is a whole comma segment
+PROVINCE_TAIL_BONUS = 4  # the province is in the last segment
+CATEGORY_BONUS = {"ward": 0, "district": 1, "province": 1}
+ADJACENT_BONUS = 3       # consecutive parts separated by at most a comma
+NEAR_BONUS = 1           # consecutive parts in the same or neighbouring segments
+
+# (category, word, start, end, score, segment)
+Span = Tuple[str, str, int, int, int, int]
+
+
+class LatticeDecoder:
+
+    def __init__(self, tries: Dict[str, Trie], compact=False):
+        self.compact = compact
+        self.sources = dict(tries)  # the tries self.trie was built from
+        self.base = self            # the decoder that built self.trie (see layered)
+        self.delta: Optional[Trie] = None  # words added since, not in self.trie
+        self.categories: Dict[str, List[str]] = {}
+        # Variants only kept by the reversed tries (acronyms such as "tgiang"): they also
+        # match inside unrelated words, so they only count when they fill a whole segment
+        self.segment_only = set()
+        trie = Trie()
+        for category in CATEGORIES:
+            words = set(tries[category].all_words)
+            reversed_trie = tries[category].reversed_trie
+            if reversed_trie is not None:
+                for word in reversed_trie.all_words - words:
+                    self.segment_only.add((word, category))
+                    words.add(word)
+            for word in sorted(words):
+                self.categories.setdefault(word, []).append(category)
+                trie.insert(word)
+        trie.build_automaton()
+        self.trie = CompactTrie(trie) if compact else trie
+
+    def layered(self, tries: Dict[str, Trie]) -> "LatticeDecoder":
+        """
+        Decoder for tries, a later version of the tries this one was built from, in which
+        categories have been replaced by LayeredTries over them (see LiveIndex.py). It
+        shares the automaton of the base decoder and only indexes the changed words; hits
+        of the base come first, so ties between unchanged words resolve as before. After
+        a category was rebuilt, a new base is built from the base tries.
+        """
+        base = self.base
+        changed = {}
+        for category in CATEGORIES:
+            trie, source = tries[category], base.sources[category]
+            if trie is source:
+                continue
+            if not (isinstance(trie, LayeredTrie) and trie.base is source):
+                bases = {category: trie.base if isinstance(trie, LayeredTrie) else trie
+                         for category, trie in tries.items()}
+                return LatticeDecoder(bases, base.compact).layered(tries)
+            changed[category] = trie
+
+        decoder = object.__new__(LatticeDecoder)
+        decoder.__dict__.update(base.__dict__)
+        if not changed:
+            return decoder
+        decoder.categories = dict(base.categories)
+        decoder.segment_only = set(base.segment_only)
+        added = set()
+        for category, trie in changed.items():
+            touched = trie.removed | trie.delta.all_words
+            backward = ()
+            if trie.reversed_trie is not None:
+                touched |= trie.reversed_trie.removed | trie.reversed_trie.delta.all_words
+                backward = trie.reversed_trie.all_words
+            for word in touched:
+                forward = word in trie.all_words
+                present = forward or word in backward
+                categories = [c for c in decoder.categories.get(word, ()) if c != category or present]
+                if present and category not in categories:
+                    categories.append(category)
+                    categories.sort(key=CATEGORIES.index)
+                decoder.categories[word] = categories
+                if present and not forward:
+                    decoder.segment_only.add((word, category))
+                else:
+                    decoder.segment_only.discard((word, category))
+                if categories and word not in base.categories:
+                    added.add(word)
+        if added:
+            decoder.delta = Trie()
+            for word in sorted(added):
+                decoder.delta.insert(word)
+            decoder.delta.build_automaton()
+        return decoder
+
+    def spans(self, text: str) -> List[Span]:
+        """Every candidate span of every category, in one automaton pass."""
+        commas = [i for i, char in enumerate(text) if char == ","]
+        last_segment = len(commas)
+        result = []
+        hits = self.trie.search_all(text)
+        if self.delta is not None:
+            hits += self.delta.search_all(text)
+        for word, start, end in hits:
+            segment = bisect_right(commas, start)
+            segment_start = commas[segment - 1] + 1 if segment > 0 else 0
+            segment_end = commas[segment] if segment < len(commas) else len(text)
+            whole_segment = start == segment_start and end == segment_end
+            score = end - start + (SEGMENT_BONUS if whole_segment else 0)
+            for category in self.categories[word]:
+                if not whole_segment and (word, category) in self.segment_only:
+                    continue
+                bonus = CATEGORY_BONUS[category]
+                if category == "province" and segment == last_segment:
+                    bonus += PROVINCE_TAIL_BONUS
+                result.append((category, word, start, end, score + bonus, segment))
+        return result
+
+    def decode(self, text: str) -> Dict[str, Optional[Span]]:
+        """Best non-overlapping assignment, at most one span per category, in reading order."""
+        by_category: Dict[str, List[Span]] = {category: [] for category in CATEGORIES}
+        for span in self.spans(text):
+            by_category[span[0]].append(span)
+
+        # best[category][i]: (total score, chain of spans) of the best assignment whose
+        # last (rightmost) span is by_category[category][i]
+        best: Dict[str, List[Tuple[int, List[Span]]]] = {}
+        for level, category in enumerate(CATEGORIES):
+            best[category] = []
+            for span in by_category[category]:
+                total, chain = span[4], [span]
+                for previous in CATEGORIES[:level]:
+                    for (previous_total, previous_chain) in best[previous]:
+                        last = previous_chain[-1]
+                        if last[3] > span[2]:
+                            continue  # overlaps or comes after this span
+                        candidate = previous_total + span[4]
+                        if span[2] - last[3] <= 1:
+                            candidate += ADJACENT_BONUS
+                        elif span[5] - last[5] <= 1:
+                            candidate += NEAR_BONUS
+                        if candidate > total:
+                            total, chain = candidate, previous_chain + [span]
+                best[category].append((total, chain))
+
+        winner: Tuple[int, List[Span]] = (0, [])
+        for category in CATEGORIES:
+            for total, chain in best[category]:
+                if total > winner[0]:
+                    winner = (total, chain)
+        assignment: Dict[str, Optional[Span]] = {category: None for category in CATEGORIES}
+        for span in winner[1]:
+            assignment[span[0]] = span
+        return assignment
+
+
+def decode_locations(decoder: LatticeDecoder, input_text: str, results) -> Tuple[Dict[str, str], str]:
+    """
+    Fill results from the lattice and return them with the text left over for the
+    autocorrect fallback (each chosen span replaced by a comma, like the cascade does).
+    """
+    assignment = decoder.decode(input_text)
+    chosen = sorted((span for span in assignment.values() if span is not None), key=lambda span: span[2], reverse=True)
+    for category, word, start, end, _, _ in chosen:
+        results[category] = word
+        input_text = input_text[:start] + "," + input_text[end:]
+    return results, input_text
@@ -0,0 +1,357 @@
+# Live index: incremental gazetteer updates and atomic version swaps
+# Solution.process reads everything it needs from one immutable AddressIndex (tries,
+# hierarchy regions, lattice, caches). Updates build the next AddressIndex off to the
+# side and publish it with a single attribute assignment, so calls already running
+# finish on the version they started with and no reader ever waits on a writer.
+#
+# Rebuilding a category from scratch takes seconds on the full ward list (the deletion
+# index alone is most of it), so an update only indexes what changed: each category
+# becomes a LayeredTrie, the base trie loaded at startup plus a small delta trie of
+# variants that were added and a set of base variants that were removed. Once the delta
+# grows past Gazetteer.rebuild_threshold the category is rebuilt into a new base, still
+# off the read path.
+#
+# Hierarchy regions (IndexAnalyzer.load_hierarchy) cannot follow a name change, which
+# does not say where the new name sits, so a Solution with a hierarchy file rejects updates.
+#
+# An AddressIndex is frozen: its attributes cannot be reassigned and its tries and
+# variation maps are read-only mappings, so one instance can be shared by any number of
+# threads (see Solution.iter_batch(mode="thread")).
+
+####################################################################
+from collections.abc import Set
+from types import MappingProxyType
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from Autocorrect import build_deletion_index, get_deletion_index
+from IndexAnalyzer import REVERSED_INDEX_CATEGORIES, CompactTrie, Trie, load_line, location_variants
+from StringTable import StringTable
+from Utils import normalize_text_but_keep_accent
+
+DEFAULT_REBUILD_THRESHOLD = 2000  # delta + removed variants of a category before it is rebuilt
+
+
+class AddressIndex:
+    """One version of everything process reads; immutable once built."""
+
+    __slots__ = ("tries", "variation_map", "regions", "lattice", "result_cache", "segment_cache", "exact", "version")
+
+    def __init__(self, tries, variation_map=None, regions=None, lattice=None, result_cache=None, segment_cache=None,
+                 exact=None, version=0):
+        variation_map = {category: MappingProxyType(variations)
+                         for category, variations in (variation_map or {}).items()}
+        values = {
+            "tries": MappingProxyType(dict(tries)),
+            "variation_map": MappingProxyType(variation_map),
+            "regions": regions,
+            "lattice": lattice,
+            # The caches are the only shared state that changes; they lock internally
+            "result_cache": result_cache,
+            "segment_cache": segment_cache,
+            "exact": exact,
+            "version": version,
+        }
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("AddressIndex is immutable, publish a new version instead")
+
+    def __delattr__(self, name):
+        raise AttributeError("AddressIndex is immutable, publish a new version instead")
+
+
+class LayeredWords(Set):
+    """all_words of a LayeredTrie: base words minus removed, plus added (disjoint from base)."""
+
+    def __init__(self, base, removed, added):
+        self.base = base
+        self.removed = removed
+        self.added = added
+
+    def __contains__(self, word):
+        return word in self.added or (word in self.base and word not in self.removed)
+
+    def __iter__(self):
+        for word in self.base:
+            if word not in self.removed:
+                yield word
+        yield from self.added
+
+    def __len__(self):
+        return len(self.base) - len(self.removed) + len(self.added)
+
+    @classmethod
+    def _from_iterable(cls, iterable):
+        return set(iterable)
+
+
+class LayeredDeletionIndex:
+    """The DeletionIndex interface used by Autocorrect over a base and a delta index."""
+
+    def __init__(self, base, delta, removed):
+        self.base = base
+        self.delta = delta
+        self.removed = removed
+        self.max_distance = min(base.max_distance, delta.max_distance)
+        # Prefilter bounds stay valid as the element-wise max of both
+        self.char_weights = dict(base.char_weights)
+        for char, weight in delta.char_weights.items():
+            if weight > self.char_weights.get(char, 0.0):
+                self.char_weights[char] = weight
+
+    def may_match(self, query: str, max_distance: int) -> bool:
+        return self.base.may_match(query, max_distance) or self.delta.may_match(query, max_distance)
+
+    def lookup(self, word: str, max_distance: int, stats=None) -> Tuple[int, List[str]]:
+        base_distance, base_words = self.base.lookup(word, max_distance, stats, self.removed)
+        delta_distance, delta_words = self.delta.lookup(word, max_distance, stats)
+        if not delta_words:
+            return base_distance, base_words
+        if not base_words or delta_distance < base_distance:
+            return delta_distance, delta_words
+        if base_distance < delta_distance:
+            return base_distance, base_words
+        return base_distance, base_words + delta_words
+
+
+class LayeredTrie:
+    """
+    A base Trie/CompactTrie with words removed and a delta Trie added on top, answering
+    the lookups Searcher, Autocorrect and Lattice make. Hits of the base come first, so
+    ties between unchanged words resolve as before.
+    """
+
+    def __init__(self, base, delta: Trie, removed: frozenset, reversed_trie: Optional["LayeredTrie"] = None):
+        self.base = base
+        self.delta = delta
+        self.removed = removed
+        self.all_words = LayeredWords(base.all_words, removed, delta.all_words)
+        # A lazy base has no deletion index until an autocorrect call needs one
+        self.deletion_index = (LayeredDeletionIndex(get_deletion_index(base, delta.deletion_index.max_distance),
+                                                    delta.deletion_index, removed)
+                               if delta.deletion_index is not None else None)
+        self.reversed_trie = reversed_trie
+
+    def search_all(self, text: str) -> List[Tuple[str, int, int]]:
+        result = [hit for hit in self.base.search_all(text) if hit[0] not in self.removed]
+        return result + self.delta.search_all(text)
+
+    def search_max_length(self, text: str, start: int) -> List[Tuple[str, int, int]]:
+        result = [hit for hit in self.base.search_max_length(text, start) if hit[0] not in self.removed]
+        return result + self.delta.search_max_length(text, start)
+
+    def search_suffixes(self, text: str, end: int) -> List[Tuple[str, int, int]]:
+        result = [hit for hit in self.base.search_suffixes(text, end) if hit[0] not in self.removed]
+        result += self.delta.search_suffixes(text, end)
+        result.sort(key=lambda hit: -hit[1])  # shortest first
+        return result
+
+    def get_raw_text(self, normalized_text):
+        raw = self.delta.original_names.get(normalized_text)
+        return raw if raw is not None else self.base.get_raw_text(normalized_text)
+
+
+class CategoryState:
+    """Writer-side bookkeeping of one category: its names and which names produce each variant."""
+
+    def __init__(self, category: str, base, names: Iterable[str], variations: Dict[str, list],
+                 strings: Optional[StringTable] = None):
+        self.category = category
+        self.reversed = category in REVERSED_INDEX_CATEGORIES
+        self.strings = strings
+        # name -> load position, in that order: the order a rebuild reads them in
+        self.names: Dict[str, int] = load_order(self.interned(names))
+        self.next_position = len(self.names) and max(self.names.values()) + 1
+        self.variations = dict(variations)  # this category of the variation map, private to the writer
+        self.reset(base)
+        self.forward: Optional[Dict[str, set]] = None  # variant -> names, built on first update
+        self.backward: Dict[str, set] = {}
+        self.normalized: Dict[str, set] = {}
+
+    def reset(self, base):
+        self.base = base
+        self.delta_forward: Dict[str, str] = {}   # variant -> raw name, not in the base trie
+        self.delta_backward: Dict[str, str] = {}  # same for the reversed trie
+        self.removed_forward = set()
+        self.removed_backward = set()
+        self.raw_overrides: Dict[str, str] = {}   # base variants whose raw name was removed
+
+    def interned(self, names: Iterable[str]) -> List[str]:
+        names = [name for name in (name.strip() for name in names) if name]
+        return names if self.strings is None else self.strings.intern_all(names)
+
+    def delta_size(self) -> int:
+        return (len(self.delta_forward) + len(self.delta_backward) +
+                len(self.removed_forward) + len(self.removed_backward))
+
+    def build_owners(self):
+        self.forward, self.backward, self.normalized = {}, {}, {}
+        for name in self.names:
+            self.link(name, True)
+
+    def link(self, name: str, add: bool) -> set:
+        """Add or drop name as an owner of its variants; returns the variants touched."""
+        forward, backward = location_variants(name, self.category, {self.category: self.variations} if add else None,
+                                              self.strings)
+        owners = [(self.forward, forward)] + ([(self.backward, backward)] if self.reversed else [])
+        touched = set()
+        for by_variant, variants in owners:
+            for variant in variants:
+                touched.add(variant)
+                names = by_variant.setdefault(variant, set())
+                if add:
+                    names.add(name)
+                else:
+                    names.discard(name)
+                    if not names:
+                        del by_variant[variant]
+
+        normalized = normalize_text_but_keep_accent(name)
+        names = self.normalized.setdefault(normalized, set())
+        if add:
+            names.add(name)
+        else:
+            names.discard(name)
+            if not names:
+                # No other name produces these variations any more
+                del self.normalized[normalized]
+                self.variations.pop(normalized, None)
+        return touched
+
+    def apply(self, added: Iterable[str], removed: Iterable[str], order: Optional[Iterable[str]] = None) -> bool:
+        """
+        Update the names and the delta; False when nothing changed. Added names are
+        loaded last unless order gives the new load order of all names (a list file).
+        """
+        if self.forward is None:
+            self.build_owners()
+        added = [name for name in dict.fromkeys(self.interned(added)) if name not in self.names]
+        removed = [name for name in dict.fromkeys(self.interned(removed)) if name in self.names]
+        touched = set()
+        for name in removed:
+            del self.names[name]
+            touched |= self.link(name, False)
+        for name in added:
+            self.names[name] = self.next_position
+            self.next_position += 1
+            touched |= self.link(name, True)
+        if order is not None:
+            self.names = load_order(self.interned(order))
+            self.next_position = len(self.names) and max(self.names.values()) + 1
+
+        base_backward = self.base.reversed_trie.all_words if self.reversed else ()
+        for variant in touched:
+            owners = self.forward.get(variant, set()) | self.backward.get(variant, set())
+            # The name loaded last, as load_line overwrites the raw name of shared variants
+            raw = max(owners, key=self.names.__getitem__) if owners else None
+            self.update_layer(variant, variant in self.forward, self.base.all_words,
+                              self.delta_forward, self.removed_forward, raw)
+            if self.reversed:
+                self.update_layer(variant, variant in self.backward, base_backward,
+                                  self.delta_backward, self.removed_backward, raw)
+            if raw is not None and (variant in self.base.all_words or variant in base_backward) \
+                    and self.base.get_raw_text(variant) != raw:
+                self.raw_overrides[variant] = raw
+            else:
+                self.raw_overrides.pop(variant, None)
+        return bool(added or removed)
+
+    @staticmethod
+    def update_layer(variant, present, base_words, delta, removed, raw):
+        if present and variant not in base_words:
+            delta[variant] = raw
+        else:
+            delta.pop(variant, None)
+        if not present and variant in base_words:
+            removed.add(variant)
+        else:
+            removed.discard(variant)
+
+    def layered(self, index_distance: int) -> LayeredTrie:
+        delta = Trie(self.strings)
+        for variant in self.delta_forward:
+            delta.insert(variant)
+        delta.original_names.update(self.delta_backward)
+        delta.original_names.update(self.delta_forward)
+        delta.original_names.update(self.raw_overrides)
+        delta.build_automaton()
+        build_deletion_index(delta, index_distance)
+
+        reversed_trie = None
+        if self.reversed:
+            delta_backward = Trie(self.strings)
+            for variant in self.delta_backward:
+                delta_backward.insert_reversed(variant)
+            reversed_trie = LayeredTrie(self.base.reversed_trie, delta_backward, frozenset(self.removed_backward))
+        return LayeredTrie(self.base, delta, frozenset(self.removed_forward), reversed_trie)
+
+
+class Gazetteer:
+    """
+    The names behind each category of a Solution and the pending delta against its base
+    tries. Used by Solution under its update lock; see Solution.apply_changes.
+    """
+
+    def __init__(self, tries, names: Dict[str, List[str]], variation_map: Dict[str, dict], index_distance: int,
+                 compact=False, rebuild_threshold=DEFAULT_REBUILD_THRESHOLD, strings: Optional[StringTable] = None):
+        self.index_distance = index_distance
+        self.compact = compact
+        self.rebuild_threshold = rebuild_threshold
+        self.strings = strings
+        self.states = {category: CategoryState(category, trie, names.get(category, ()), variation_map.get(category, {}),
+                                               strings)
+                       for category, trie in tries.items()}
+
+    def state(self, category: str) -> CategoryState:
+        if category not in self.states:
+            raise ValueError(f"Unknown category {category!r}, expected one of {sorted(self.states)}")
+        return self.states[category]
+
+    def apply(self, category: str, added: Iterable[str], removed: Iterable[str], order=None):
+        """The new trie of category, or None if the change is a no-op."""
+        state = self.state(category)
+        if not state.apply(added, removed, order):
+            return None
+        if state.delta_size() > self.rebuild_threshold:
+            return self.rebuild(category)
+        return state.layered(self.index_distance)
+
+    def replace(self, category: str, names: List[str]):
+        """Like apply, with the difference between the current names and names (a reloaded list file)."""
+        state = self.state(category)
+        keep = set(names)
+        return self.apply(category, names, [name for name in state.names if name not in keep], names)
+
+    def rebuild(self, category: str):
+        """Index the current names of category from scratch into a new base trie."""
+        state = self.state(category)
+        trie = Trie(self.strings)
+        reversed_trie = Trie(self.strings)
+        for name in state.names:
+            load_line(name, trie, reversed_trie, category)
+        trie.build_automaton()
+        if state.reversed:
+            trie.reversed_trie = reversed_trie
+        build_deletion_index(trie, self.index_distance)
+        base = CompactTrie(trie) if self.compact else trie
+        state.reset(base)
+        return base
+
+
+def load_order(names: Iterable[str]) -> Dict[str, int]:
+    """name -> position of its last line, ordered by it: load_line keeps the raw name of the last line."""
+    order = {}
+    for position, name in enumerate(names):
+        order.pop(name, None)
+        order[name] = position
+    return order
+
+
+def read_names(filename: str) -> List[str]:
+    """Location names of a list file, as load_line reads them."""
+    try:
+        with open(filename, "r", encoding="utf-8") as file:
+            return [name for name in (line.strip() for line in file) if name]
+    except FileNotFoundError:
+        return []
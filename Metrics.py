@@ -0,0 +1,161 @@
+# Lightweight metrics primitives shared by the server and the instrumentation
+# Histograms use fixed bucket bounds so they are cheap to update, merge and dump.
+# RequestStats/Instrumentation back the opt-in per-stage profiling of Solution.process.
+
+####################################################################
+import bisect
+import threading
+import time
+from typing import Dict, List, Optional
+
+# Latency buckets in seconds, from 50us to 1s
+LATENCY_BUCKETS = [0.00005, 0.0001, 0.0002, 0.0005, 0.001, 0.002, 0.005,
+                   0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0]
+
+
+class Histogram:
+
+    def __init__(self, bounds: Optional[List[float]] = None):
+        self.bounds = list(bounds or LATENCY_BUCKETS)
+        self.counts = [0] * (len(self.bounds) + 1)  # last bucket is +inf
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: "Histogram"):
+        for i, count in enumerate(other.counts):
+            self.counts[i] += count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile (the observed max for +inf)."""
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return self.bounds[i] if i < len(self.bounds) else self.max
+        return self.max
+
+    def to_dict(self) -> Dict:
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+            "buckets": self.bucket_dict(),
+        }
+
+    def bucket_dict(self) -> Dict[str, int]:
+        """Cumulative counts per upper bound, Prometheus style."""
+        buckets = {}
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            buckets["+Inf" if i == len(self.bounds) else f"{self.bounds[i]:g}"] = seen
+        return buckets
+
+
+# Histogram bounds for per-request counts (trie characters, candidates, ...)
+COUNT_BUCKETS = [0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000]
+
+STAGES = ["segment", "exact", "trie_search", "resegment", "fuzzy_search", "finalize"]
+
+
+class RequestStats:
+    """Timings and counters of one Solution.process call, filled in only when instrumentation is on."""
+
+    def __init__(self):
+        self.started = self.tick = time.perf_counter()
+        self.stage_times: Dict[str, float] = {}
+        self.exact_resolved = 0         # categories resolved by the exact-match fast path
+        self.exact_hit = False          # the fast path resolved the whole address
+        self.trie_chars = 0             # characters fed through the trie automata (not node visits)
+        self.autocorrect_calls = 0
+        self.prefiltered = 0            # autocorrect calls answered by the noise prefilter
+        self.edit_distance_calls = 0    # candidates verified with editdistance
+        self.cosine_scored = 0          # candidates re-ranked with cosine similarity
+        self.fallback_categories: List[str] = []  # categories resolved by fuzzy search
+        self.cache_hit = False
+
+    def lap(self, stage: str):
+        """Charge the time since the previous lap to stage."""
+        now = time.perf_counter()
+        self.stage_times[stage] = now - self.tick
+        self.tick = now
+
+
+class Instrumentation:
+    """Aggregates RequestStats into histograms and counters that can be dumped or scraped."""
+
+    def __init__(self):
+        self.requests = 0
+        self.cache_hits = 0
+        self.exact_hits = 0
+        self.stage_times = {stage: Histogram() for stage in STAGES}
+        self.total_time = Histogram()
+        self.counters = {name: Histogram(COUNT_BUCKETS)
+                         for name in ["exact_resolved", "trie_chars", "autocorrect_calls", "prefiltered",
+                                      "edit_distance_calls", "cosine_scored"]}
+        self.fallbacks = {"province": 0, "district": 0, "ward": 0}
+        self.lock = threading.Lock()
+
+    def record(self, stats: RequestStats, total_time: float):
+        with self.lock:
+            self.requests += 1
+            self.total_time.observe(total_time)
+            if stats.cache_hit:
+                self.cache_hits += 1
+                return
+            if stats.exact_hit:
+                self.exact_hits += 1
+            for stage, seconds in stats.stage_times.items():
+                self.stage_times[stage].observe(seconds)
+            for name, histogram in self.counters.items():
+                histogram.observe(getattr(stats, name))
+            for category in stats.fallback_categories:
+                self.fallbacks[category] += 1
+
+    def to_dict(self) -> Dict:
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "cache_hits": self.cache_hits,
+                "exact_hits": self.exact_hits,
+                "total_time_sec": self.total_time.to_dict(),
+                "stage_time_sec": {stage: h.to_dict() for stage, h in self.stage_times.items()},
+                "counters": {name: h.to_dict() for name, h in self.counters.items()},
+                "fallback_resolved": dict(self.fallbacks),
+            }
+
+    def prometheus_text(self, prefix="address_classifier") -> str:
+        """Text exposition format, for scraping."""
+        histograms = [(f"{prefix}_request_seconds", {}, self.total_time)]
+        histograms += [(f"{prefix}_stage_seconds", {"stage": s}, h) for s, h in self.stage_times.items()]
+        histograms += [(f"{prefix}_{name}", {}, h) for name, h in self.counters.items()]
+        with self.lock:
+            lines = [f"{prefix}_requests_total {self.requests}",
+                     f"{prefix}_cache_hits_total {self.cache_hits}",
+                     f"{prefix}_exact_hits_total {self.exact_hits}"]
+            for name, labels, histogram in histograms:
+                label_text = "".join(f'{k}="{v}",' for k, v in labels.items())
+                for bound, count in histogram.bucket_dict().items():
+                    lines.append(f'{name}_bucket{{{label_text}le="{bound}"}} {count}')
+                lines.append(f"{name}_sum{{{label_text.rstrip(',')}}} {histogram.total}")
+                lines.append(f"{name}_count{{{label_text.rstrip(',')}}} {histogram.count}")
+            for category, count in self.fallbacks.items():
+                lines.append(f'{prefix}_fallback_resolved_total{{category="{category}"}} {count}')
+        return "\n".join(lines) + "\n"
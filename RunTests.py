@@ -1,11 +1,19 @@
+# Accuracy and timing evaluation against public.json
+# Importable: evaluate() scores a Solution on labelled data and returns per-address
+# rows; benchmarks/Benchmark.py builds the latency suite on top of it. pandas and
+# xlsxwriter are only needed for --excel.
+#
+# Usage (from the repository root):
+#   python RunTests.py [--test-file public.json] [--quiet] [--excel]
+
+####################################################################
+import argparse
 import json
 import time
-import pandas as pd
 from datetime import datetime
 
 from Solution import Solution
 
-debug = True
 # CORRECT TESTS
 groups_province = {}
 groups_district = {'hòa bình': ['Hoà Bình', 'Hòa Bình'], 'kbang': ['Kbang', 'KBang'], 'quy nhơn': ['Qui Nhơn', 'Quy Nhơn']}
@@ -27,117 +35,9 @@ def get_formatted_datetime():
 
 #
 TEAM_NAME = f'GROUP4_{get_formatted_datetime()}'  # This should be your team name
-EXCEL_FILE = f'{TEAM_NAME}.xlsx'
 TEST_FILE = 'public.json'
-with open(TEST_FILE, encoding='utf-8') as f:
-    data = json.load(f)
-
-summary_only = True
-df = []
-solution = Solution()
-timer = []
-correct = 0
-for test_idx, data_point in enumerate(data):
-    address = data_point["text"]
-
-    ok = 0
-    try:
-        answer = data_point["result"]
-        answer["province_normalized"] = normalize(answer["province"], same_province)
-        answer["district_normalized"] = normalize(answer["district"], same_district)
-        answer["ward_normalized"] = normalize(answer["ward"], same_ward)
 
-        start = time.perf_counter_ns()
-        result = solution.process(address)
-        finish = time.perf_counter_ns()
-        timer.append(finish - start)
-        result["province_normalized"] = normalize(result["province"], same_province)
-        result["district_normalized"] = normalize(result["district"], same_district)
-        result["ward_normalized"] = normalize(result["ward"], same_ward)
-
-        province_correct = int(answer["province_normalized"] == result["province_normalized"])
-        district_correct = int(answer["district_normalized"] == result["district_normalized"])
-        ward_correct = int(answer["ward_normalized"] == result["ward_normalized"])
-        ok = province_correct + district_correct + ward_correct
-
-        df.append([
-            test_idx,
-            address,
-            answer["province"],
-            result["province"],
-            answer["province_normalized"],
-            result["province_normalized"],
-            province_correct,
-            answer["district"],
-            result["district"],
-            answer["district_normalized"],
-            result["district_normalized"],
-            district_correct,
-            answer["ward"],
-            result["ward"],
-            answer["ward_normalized"],
-            result["ward_normalized"],
-            ward_correct,
-            ok,
-            timer[-1] / 1_000_000_000,
-        ])
-        if debug and ok < 3:
-            print()
-            print("Original: " + address)
-            if province_correct == 0:
-                print(f"Province -> Result: '{result['province']}', Answer: '{answer['province']}'")
-            if district_correct == 0:
-                print(f"District -> Result: '{result['district']}', Answer: '{answer['district']}'")
-            if ward_correct == 0:
-                print(f"Ward -> Result: '{result['ward']}', Answer: '{answer['ward']}'")
-    except Exception as e:
-        print(f"{answer = }")
-        print(f"{result = }")
-        df.append([
-            test_idx,
-            address,
-            answer["province"],
-            "EXCEPTION",
-            answer["province_normalized"],
-            "EXCEPTION",
-            0,
-            answer["district"],
-            "EXCEPTION",
-            answer["district_normalized"],
-            "EXCEPTION",
-            0,
-            answer["ward"],
-            "EXCEPTION",
-            answer["ward_normalized"],
-            "EXCEPTION",
-            0,
-            0,
-            0,
-        ])
-        # any failure count as a zero correct
-        pass
-    correct += ok
-
-    if not summary_only:
-        # responsive stuff
-        print(f"Test {test_idx:5d}/{len(data):5d}")
-        print(f"Correct: {ok}/3")
-        print(f"Time Executed: {timer[-1] / 1_000_000_000:.4f}")
-
-print(f"-" * 30)
-total = len(data) * 3
-score_scale_10 = round(correct / total * 10, 2)
-if len(timer) == 0:
-    timer = [0]
-max_time_sec = round(max(timer) / 1_000_000_000, 4)
-avg_time_sec = round((sum(timer) / len(timer)) / 1_000_000_000, 4)
-
-df2 = pd.DataFrame(
-    [[correct, total, score_scale_10, max_time_sec, avg_time_sec]],
-    columns=['correct', 'total', 'score / 10', 'max_time_sec', 'avg_time_sec', ],
-)
-
-columns = [
+COLUMNS = [
     'ID',
     'text',
     'province',
@@ -159,17 +59,158 @@ columns = [
     'time_sec',
 ]
 
-df = pd.DataFrame(df)
-df.columns = columns
 
-print(df2)
+def load_test_data(test_file=TEST_FILE):
+    with open(test_file, encoding='utf-8') as f:
+        return json.load(f)
+
 
-if not debug:
-    print(f'{TEAM_NAME = }')
-    print(f'{EXCEL_FILE = }')
+def evaluate(solution, data, debug=False, summary_only=True):
+    """
+    Classify every data point, timing each call. Returns (rows, correct, timer):
+    one row per address in COLUMNS order, the number of correct fields and the
+    per-call times in nanoseconds.
+    """
+    rows = []
+    timer = []
+    correct = 0
+    for test_idx, data_point in enumerate(data):
+        address = data_point["text"]
 
-    with pd.ExcelWriter(EXCEL_FILE, engine='xlsxwriter') as writer:
+        ok = 0
+        answer = dict(data_point["result"])
+        answer["province_normalized"] = normalize(answer["province"], same_province)
+        answer["district_normalized"] = normalize(answer["district"], same_district)
+        answer["ward_normalized"] = normalize(answer["ward"], same_ward)
+        result = None
+        try:
+            start = time.perf_counter_ns()
+            result = solution.process(address)
+            finish = time.perf_counter_ns()
+            timer.append(finish - start)
+            result = dict(result)
+            result["province_normalized"] = normalize(result["province"], same_province)
+            result["district_normalized"] = normalize(result["district"], same_district)
+            result["ward_normalized"] = normalize(result["ward"], same_ward)
+
+            province_correct = int(answer["province_normalized"] == result["province_normalized"])
+            district_correct = int(answer["district_normalized"] == result["district_normalized"])
+            ward_correct = int(answer["ward_normalized"] == result["ward_normalized"])
+            ok = province_correct + district_correct + ward_correct
+
+            rows.append([
+                test_idx,
+                address,
+                answer["province"],
+                result["province"],
+                answer["province_normalized"],
+                result["province_normalized"],
+                province_correct,
+                answer["district"],
+                result["district"],
+                answer["district_normalized"],
+                result["district_normalized"],
+                district_correct,
+                answer["ward"],
+                result["ward"],
+                answer["ward_normalized"],
+                result["ward_normalized"],
+                ward_correct,
+                ok,
+                timer[-1] / 1_000_000_000,
+            ])
+            if debug and ok < 3:
+                print()
+                print("Original: " + address)
+                if province_correct == 0:
+                    print(f"Province -> Result: '{result['province']}', Answer: '{answer['province']}'")
+                if district_correct == 0:
+                    print(f"District -> Result: '{result['district']}', Answer: '{answer['district']}'")
+                if ward_correct == 0:
+                    print(f"Ward -> Result: '{result['ward']}', Answer: '{answer['ward']}'")
+        except Exception as e:
+            print(f"{answer = }")
+            print(f"{result = }")
+            rows.append([
+                test_idx,
+                address,
+                answer["province"],
+                "EXCEPTION",
+                answer["province_normalized"],
+                "EXCEPTION",
+                0,
+                answer["district"],
+                "EXCEPTION",
+                answer["district_normalized"],
+                "EXCEPTION",
+                0,
+                answer["ward"],
+                "EXCEPTION",
+                answer["ward_normalized"],
+                "EXCEPTION",
+                0,
+                0,
+                0,
+            ])
+            # any failure count as a zero correct
+            pass
+        correct += ok
+
+        if not summary_only:
+            # responsive stuff
+            print(f"Test {test_idx:5d}/{len(data):5d}")
+            print(f"Correct: {ok}/3")
+            print(f"Time Executed: {timer[-1] / 1_000_000_000:.4f}")
+    return rows, correct, timer
+
+
+def summarize(data, correct, timer):
+    total = len(data) * 3
+    if len(timer) == 0:
+        timer = [0]
+    return {
+        'correct': correct,
+        'total': total,
+        'score / 10': round(correct / total * 10, 2),
+        'max_time_sec': round(max(timer) / 1_000_000_000, 4),
+        'avg_time_sec': round((sum(timer) / len(timer)) / 1_000_000_000, 4),
+    }
+
+
+def save_excel(summary, rows, excel_file):
+    import pandas as pd  # only needed for the spreadsheet
+
+    df2 = pd.DataFrame([list(summary.values())], columns=list(summary))
+    df = pd.DataFrame(rows)
+    df.columns = COLUMNS
+    with pd.ExcelWriter(excel_file, engine='xlsxwriter') as writer:
         df2.to_excel(writer, index=False, sheet_name='summary')
         df.to_excel(writer, index=False, sheet_name='details')
 
-print("Excel file saved successfully.")
+
+def main():
+    parser = argparse.ArgumentParser(description="Score Solution on labelled addresses")
+    parser.add_argument("--test-file", default=TEST_FILE)
+    parser.add_argument("--quiet", action="store_true", help="do not print the wrong answers")
+    parser.add_argument("--verbose", action="store_true", help="print every test")
+    parser.add_argument("--excel", action="store_true", help="save summary and details to an .xlsx (needs pandas)")
+    args = parser.parse_args()
+
+    data = load_test_data(args.test_file)
+    solution = Solution()
+    rows, correct, timer = evaluate(solution, data, debug=not args.quiet, summary_only=not args.verbose)
+
+    print(f"-" * 30)
+    summary = summarize(data, correct, timer)
+    print("  ".join(f"{k}: {v}" for k, v in summary.items()))
+
+    if args.excel:
+        excel_file = f'{TEAM_NAME}.xlsx'
+        print(f'{TEAM_NAME = }')
+        print(f'{excel_file = }')
+        save_excel(summary, rows, excel_file)
+        print("Excel file saved successfully.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,77 +1,191 @@
+import time
 from typing import Dict, Tuple, Optional
 
-from IndexAnalyzer import Trie
-from Autocorrect import autocorrect
-
-def search_locations_in_trie(tries: Dict[str, Trie], input_text: str, results) -> Tuple[Dict[str, Optional[str]], str]:
-    matched_positions = set()
-
-    remaining_chars = list(input_text)
-
+from IndexAnalyzer import ExactIndex, Trie, region_key
+from Autocorrect import DEFAULT_CONFIG, autocorrect
+
+class Deadline:
+    """
+    Time budget of one request. The fuzzy fallback checks it before every
+    autocorrect call and records the categories it had to give up on in cut_off.
+    """
+
+    def __init__(self, budget: float, start: Optional[float] = None):
+        self.at = (time.perf_counter() if start is None else start) + budget
+        self.cut_off = []
+
+    def expired(self) -> bool:
+        return time.perf_counter() >= self.at
+
+def select_trie(tries: Dict[str, Trie], category, results, regions=None) -> Trie:
+    """
+    The trie to search for category: with a hierarchy loaded (see
+    IndexAnalyzer.load_hierarchy), only the children of the province/district
+    already found; otherwise the whole country.
+    """
+    if not regions or category not in regions:
+        return tries[category]
+
+    province = region_key(raw_name(tries, "province", results, regions)) if results["province"] else ""
+    # Districts are only keyed by their province
+    district = region_key(raw_name(tries, "district", results, regions)) \
+        if category == "ward" and results["district"] else ""
+    for parent in [(province, district), (province,)]:
+        if all(parent) and parent in regions[category]:
+            return regions[category][parent]
+    return tries[category]
+
+def raw_name(tries: Dict[str, Trie], category, results, regions=None) -> str:
+    """
+    The list file name of results[category]. With a hierarchy it comes from the
+    regional trie of the parents found when it knows the word, so the country-wide
+    trie (built lazily with Solution(lazy=True)) is only needed for the others.
+    """
+    word = results[category]
+    if word and regions and category in regions:
+        raw = select_trie(tries, category, results, regions).original_names.get(word)
+        if raw is not None:
+            return raw
+    return tries[category].get_raw_text(word)
+
+def search_exact(exact: ExactIndex, tries: Dict[str, Trie], input_text: str, results, regions=None,
+                 stats=None) -> Tuple[Dict[str, str], str, bool]:
+    """
+    Exact-match fast path: the last segments of input_text that are, as a whole, names of
+    the province, then the district, then the ward (one hash lookup each) fill results.
+    Returns (results, the text before those segments, whether all three categories, or
+    every segment, were resolved); the cascade then only searches what is left.
+    """
+    segments = input_text.split(",")
+    end = len(segments)
+    resolved = 0
+    for category in ("province", "district", "ward"):
+        while end > 0 and segments[end - 1] == "":
+            end -= 1
+        if end == 0:
+            break
+        segment = segments[end - 1]
+        trie = select_trie(tries, category, results, regions)
+        if not exact.names(segment, category, trie):
+            break
+        results[category] = segment
+        resolved += 1
+        end -= 1
+    if stats is not None:
+        stats.exact_resolved += resolved
+    if resolved == 0:
+        return results, input_text, False
+    complete = resolved == 3 or not any(segments[:end])
+    return results, ",".join(segments[:end]) + ",", complete
+
+def search_locations_in_trie(tries: Dict[str, Trie], input_text: str, results, regions=None, stats=None,
+                             tail_match=True) -> Tuple[Dict[str, Optional[str]], str]:
     for category, reverse in [("province", True), ("district", False), ("ward", False)]:
         if results[category] != "":
             continue
-        match = search_part(tries[category], input_text, matched_positions, remaining_chars, reverse)
+        trie = select_trie(tries, category, results, regions)
+        match = None
+        if reverse and tail_match and trie.reversed_trie is not None:
+            match = search_tail(trie, input_text)
+        if match is not None:
+            if stats is not None:
+                stats.trie_chars += len(input_text) - match[1]
+        else:
+            match = search_part(trie, input_text, reverse)
+            if stats is not None:
+                stats.trie_chars += len(input_text)
         res = match[0]
         if match and res:
             input_text = input_text[:match[1]] + "," + input_text[match[2]:]
         results[category] = res
     return results, input_text
 
-def search_locations_in_segments(tries: Dict[str, Trie], segments: [], results) -> Tuple[Dict[str, Optional[str]], str]:
+def search_locations_in_segments(tries: Dict[str, Trie], segments: [], results, regions=None, cache=None, stats=None,
+                                 deadline: Optional[Deadline] = None, config=DEFAULT_CONFIG) -> Tuple[Dict[str, Optional[str]], str]:
     for category, reverse in [("province", True), ("ward", False), ("district", False)]:
         if results[category] != "":
             continue
 
-        res = search_in_segment(segments, tries[category], category, reverse)
+        trie = select_trie(tries, category, results, regions)
+        res, position = search_in_segment(segments, trie, category, reverse, cache, stats, deadline, config)
+        if position >= 0:
+            segments = segments[:position] + segments[position + 1:]
+            if reverse:
+                # A hit of the right-to-left search leaves the remaining segments in that
+                # order for the ward and district passes, as the search always has
+                segments.reverse()
+        if res is None:
+            # Out of time: leave this category empty
+            deadline.cut_off.append(category)
+            res = ""
+        elif stats is not None and res:
+            stats.fallback_categories.append(category)
         results[category] = res
 
     return results, segments
 
-def search_in_trie(trie, input_text, matched_positions, remaining_chars, reverse):
-    match = search_part(trie, input_text, matched_positions, remaining_chars, reverse)
-    res = match[0]
-    if match and res:
-        input_text = input_text[:match[1]] + "," + input_text[match[2]:]
-    return res, input_text
-
-def search_in_segment(segments, trie, category, reverse=False):
-    if reverse:
-        segments.reverse()
-
-    for seg in segments:
-        word = autocorrect(seg, trie, category)
-        if word == "":
-            continue
-        segments.remove(seg)
-        return word
-
-    if reverse:
-        segments.reverse()
-
-    return ""
+def cached_autocorrect(seg, trie, category, cache=None, stats=None, config=DEFAULT_CONFIG):
+    """
+    autocorrect behind an optional Cache.LRUCache keyed by (segment, category, trie).
+    A cache must not be shared between different configs.
+    """
+    if cache is None:
+        return autocorrect(seg, trie, category, stats, config)
+    # The trie is part of the key because regional tries answer differently
+    key = (seg, category, id(trie))
+    word = cache.get(key)
+    if word is None:
+        word = autocorrect(seg, trie, category, stats, config)
+        cache.put(key, word)
+    return word
+
+def search_in_segment(segments, trie, category, reverse=False, cache=None, stats=None, deadline=None,
+                      config=DEFAULT_CONFIG) -> Tuple[Optional[str], int]:
+    """
+    (word, position) of the first segment (the last one with reverse) that autocorrects
+    to a word of trie; ("", -1) if none does and (None, -1) if the deadline ran out.
+    segments is left unchanged.
+    """
+    positions = range(len(segments) - 1, -1, -1) if reverse else range(len(segments))
+    for position in positions:
+        if deadline is not None and deadline.expired():
+            return None, -1
+        word = cached_autocorrect(segments[position], trie, category, cache, stats, config)
+        if word != "":
+            return word, position
+
+    return "", -1
+
+def search_tail(trie, input_text) -> Optional[Tuple[str, int, int]]:
+    """
+    Right-to-left match with trie.reversed_trie: walk back from the end of the text,
+    then from each comma, and take the longest name ending at the first boundary that
+    has one. That hit is returned only when it is confident, i.e. a regular name of
+    trie or a variant covering its whole segment (acronyms like "tgiang" would
+    otherwise match the tail of unrelated words); otherwise, or when no name ends at a
+    boundary, None tells the caller to fall back to search_part.
+    Addresses that end with the province cost a walk over its name only.
+    """
+    end = len(input_text)
+    while end >= 0:
+        hits = trie.reversed_trie.search_suffixes(input_text, end)
+        if hits:
+            word, start, _ = best = hits[-1]
+            if word in trie.all_words or start == input_text.rfind(",", 0, end) + 1:
+                return best
+            return None
+        end = input_text.rfind(",", 0, end)
+    return None
+
+def search_part(trie, input_text, reversed=False):
+    # One Aho-Corasick pass yields every hit; the selection below reproduces the old
+    # start-by-start scan: forward keeps the hit ending last (then longest),
+    # reversed keeps the hit starting last (then longest).
+    matches = trie.search_all(input_text)
+    if not matches:
+        return "", None, None
 
-def search_part(trie, input_text, matched_positions, remaining_chars, reversed=False):
-    it_range = range(len(input_text))
-    matched_intervals = []
     if reversed:
-        it_range = it_range.__reversed__()
-    for i in it_range:
-        if i in matched_positions:
-            continue
-        matches = trie.search_max_length(input_text, i)
-
-        if matches:
-            best_match = max(matches, key=lambda x: (x[2], x[2] - x[1]))  # Prioritize the end and length
-            # Check if the best match is actually the longest match covering the end of the string
-            if any(match[1] <= len(input_text) - 1 <= match[2] for match in matches):
-                best_match = max(matches, key=lambda x: (x[2], x[2] - x[1]))
-
-            # Ensure no overlap with previously matched regions
-            start, end = best_match[1], best_match[2]
-            if any(s <= start < e or s < end <= e for s, e in matched_intervals):
-                continue  # Skip overlapping matches
-
-            # Remove matched characters properly
-            return best_match
-    return "", None, None
+        return max(matches, key=lambda x: (x[1], x[2]))
+    return max(matches, key=lambda x: (x[2], x[2] - x[1]))  # Prioritize the end and length
+
@@ -0,0 +1,220 @@
+# asyncio classification service
+# Holds one loaded Solution and serves newline-delimited JSON over TCP or a Unix socket.
+#
+#   request:  {"id": 1, "text": "357/28,Ng-T- Thuật,P1,Q3,TP.HồChíMinh."}
+#   response: {"id": 1, "result": {"province": "Hồ Chí Minh", "district": "", "ward": ""}}
+#   request:  {"command": "metrics"}
+#   response: {"metrics": {...}}       (plus "instrumentation" when started with --instrument)
+#
+# Concurrent requests are coalesced into micro-batches: the first queued request opens
+# a window of --window-ms, and everything that arrives within it (up to --max-batch)
+# is classified together on the worker pool. A connection may pipeline requests;
+# responses carry the request id and can come back out of order.
+#
+# Usage (from the repository root, listens on localhost only):
+#   python Server.py [--port 8765 | --unix /tmp/address.sock] [--workers 2 | --threads 4] [--window-ms 2]
+
+####################################################################
+import argparse
+import asyncio
+import json
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from Metrics import Histogram
+from Solution import Solution, _process_chunk_in_worker, fork_executor
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+
+class ServerMetrics:
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.requests = 0
+        self.errors = 0
+        self.batches = 0
+        self.batched_requests = 0
+        self.max_queue_depth = 0
+        self.latency = Histogram()     # enqueue -> result, per request
+        self.batch_time = Histogram()  # time spent classifying one batch
+        self.last_scrape = (self.started, 0)
+
+    def to_dict(self, queue_depth: int):
+        now = time.monotonic()
+        scrape_time, scrape_requests = self.last_scrape
+        self.last_scrape = (now, self.requests)
+        return {
+            "uptime_sec": now - self.started,
+            "requests": self.requests,
+            "errors": self.errors,
+            "request_rate": self.requests / max(now - self.started, 1e-9),
+            "request_rate_since_last_scrape": (self.requests - scrape_requests) / max(now - scrape_time, 1e-9),
+            "queue_depth": queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "batches": self.batches,
+            "avg_batch_size": self.batched_requests / self.batches if self.batches else 0.0,
+            "latency_sec": self.latency.to_dict(),
+            "batch_time_sec": self.batch_time.to_dict(),
+        }
+
+
+class ClassificationServer:
+
+    def __init__(self, solution: Solution, window=0.002, max_batch=256, workers=0, threads=1):
+        self.solution = solution
+        self.window = window
+        self.max_batch = max_batch
+        self.metrics = ServerMetrics()
+        self.queue: asyncio.Queue = asyncio.Queue()
+
+        # workers=0 classifies on `threads` threads of this process sharing the Solution
+        # (more than one only pays off on free-threaded Python), otherwise batches go to
+        # forked processes sharing the loaded index.
+        if workers > 0:
+            self.executor = fork_executor(solution, workers)
+            self.classify = _process_chunk_in_worker
+        else:
+            self.executor = ThreadPoolExecutor(max_workers=threads)
+            self.classify = solution.process_chunk
+        self.batch_slots = asyncio.Semaphore(workers if workers > 0 else threads)
+
+    async def submit(self, text: str):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((text, future, time.perf_counter()))
+        self.metrics.max_queue_depth = max(self.metrics.max_queue_depth, self.queue.qsize())
+        return await future
+
+    async def batcher(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # One batch per worker in flight; the next window fills while they run
+            await self.batch_slots.acquire()
+            loop.create_task(self.run_batch(batch))
+
+    async def run_batch(self, batch):
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        try:
+            results = await loop.run_in_executor(self.executor, self.classify, [text for text, _, _ in batch])
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self.batch_slots.release()
+
+        finish = time.perf_counter()
+        self.metrics.batches += 1
+        self.metrics.batched_requests += len(batch)
+        self.metrics.batch_time.observe(finish - start)
+        for (_, future, enqueued), result in zip(batch, results):
+            self.metrics.latency.observe(finish - enqueued)
+            if not future.done():
+                future.set_result(result)
+
+    async def handle_request(self, line: bytes, writer: asyncio.StreamWriter):
+        response = {}
+        try:
+            request = json.loads(line)
+            if "id" in request:
+                response["id"] = request["id"]
+            if request.get("command") == "metrics":
+                response["metrics"] = self.metrics.to_dict(self.queue.qsize())
+                # Per-stage stats are only collected in this process, i.e. with workers=0
+                if self.solution.instrumentation is not None:
+                    response["instrumentation"] = self.solution.instrumentation.to_dict()
+            else:
+                self.metrics.requests += 1
+                # Checked before queueing: a bad request must not fail the rest of its batch
+                text = request.get("text")
+                if not isinstance(text, str):
+                    raise ValueError(f"'text' must be a string, got {type(text).__name__}")
+                response["result"] = await self.submit(text)
+        except Exception as e:
+            self.metrics.errors += 1
+            response["error"] = f"{type(e).__name__}: {e}"
+        writer.write(json.dumps(response, ensure_ascii=False).encode() + b"\n")
+        await writer.drain()
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        tasks = set()
+        try:
+            while line := await reader.readline():
+                if line.strip():
+                    task = asyncio.create_task(self.handle_request(line, writer))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            writer.close()
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT, unix_path=None):
+        loop = asyncio.get_running_loop()
+        stopping = asyncio.Event()
+        batcher = asyncio.create_task(self.batcher())
+        if unix_path:
+            server = await asyncio.start_unix_server(self.handle_client, path=unix_path)
+        else:
+            server = await asyncio.start_server(self.handle_client, host=host, port=port)
+        # SIGTERM (process managers, LoadGenerator --spawn) stops the server like Ctrl+C does
+        try:
+            loop.add_signal_handler(signal.SIGTERM, stopping.set)
+        except (NotImplementedError, RuntimeError):
+            pass  # no signal handlers on Windows or outside the main thread
+        addresses = ", ".join(str(sock.getsockname()) for sock in server.sockets)
+        print(f"Serving on {addresses}", flush=True)
+        try:
+            await stopping.wait()
+        finally:
+            server.close()
+            batcher.cancel()
+            # Waits for the forked workers to exit, so none outlives the server
+            self.executor.shutdown(wait=True, cancel_futures=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Address classification server (newline-delimited JSON)")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", help="listen on this Unix socket path instead of TCP")
+    parser.add_argument("--window-ms", type=float, default=2.0, help="micro-batching window")
+    parser.add_argument("--max-batch", type=int, default=256)
+    parser.add_argument("--workers", type=int, default=0, help="forked worker processes (0: threads)")
+    parser.add_argument("--threads", type=int, default=1, help="classifier threads with --workers 0")
+    parser.add_argument("--instrument", action="store_true", help="collect per-stage timings (with --workers 0)")
+    parser.add_argument("--budget-ms", type=float, help="per-request time budget; results then list resolved/cut_off fields")
+    parser.add_argument("--guard", action="store_true", help="bound the work per request by the input size")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    budget = args.budget_ms / 1000 if args.budget_ms is not None else None
+    solution = Solution(instrument=args.instrument, budget=budget, guard=args.guard)
+    print(f"Index loaded in {time.perf_counter() - start:.2f}s", flush=True)
+
+    async def run():
+        server = ClassificationServer(solution, args.window_ms / 1000, args.max_batch, args.workers, args.threads)
+        await server.serve(args.host, args.port, args.unix)
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
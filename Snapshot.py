@@ -0,0 +1,184 @@
+# Prebuilt index snapshot
+# Building the tries and deletion indexes from the list files takes seconds with the
+# full ward database. A snapshot stores the built index in one versioned file:
+#
+#   MAGIC | header length (4 bytes) | JSON header | pickle payload | raw buffers
+#
+# The header holds the format version and a hash of the list files' content, so a
+# snapshot built from other data is detected as stale without reading the payload.
+# Large integer arrays (the SymSpell id tables) are written as out-of-band pickle
+# buffers and are read back as views over the memory-mapped file instead of copies.
+#
+# Build a snapshot (from the repository root):
+#   python Snapshot.py [--data-dir vietnamese-provinces-database] [--output address_index.snapshot]
+
+####################################################################
+import argparse
+import gc
+import hashlib
+import json
+import mmap
+import os
+import pickle
+import struct
+import time
+from typing import Dict, Optional
+
+from Autocorrect import build_deletion_index
+from IndexAnalyzer import Trie, load_databases
+from StringTable import StringTable
+
+SNAPSHOT_VERSION = 4
+SNAPSHOT_MAGIC = b"ADDRIDX\0"
+BUFFER_ALIGNMENT = 8
+DEFAULT_SNAPSHOT_PATH = "address_index.snapshot"
+
+
+def content_hash(filenames: Dict[str, str]) -> str:
+    """Hash of the list files, in category order, together with the snapshot version."""
+    digest = hashlib.sha256(f"v{SNAPSHOT_VERSION}".encode())
+    for category in sorted(filenames):
+        digest.update(category.encode())
+        with open(filenames[category], "rb") as file:
+            digest.update(hashlib.sha256(file.read()).digest())
+    return digest.hexdigest()
+
+
+def save_snapshot(path: str, filenames: Dict[str, str], tries: Dict[str, Trie], variation_map: Dict[str, dict]):
+    buffers = []
+    payload = pickle.dumps({
+        "tries": tries,
+        "variation_map": {category: variation_map.get(category, {}) for category in tries},
+    }, protocol=5, buffer_callback=buffers.append)
+
+    # Lay out the buffers after the payload, each one aligned for typed views
+    raw_buffers = [buffer.raw() for buffer in buffers]
+    header = {
+        "version": SNAPSHOT_VERSION,
+        "content_hash": content_hash(filenames),
+        "payload_length": len(payload),
+        "buffer_lengths": [buffer.nbytes for buffer in raw_buffers],
+    }
+    header_bytes = json.dumps(header).encode()
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(SNAPSHOT_MAGIC)
+        file.write(struct.pack("<I", len(header_bytes)))
+        file.write(header_bytes)
+        file.write(payload)
+        for buffer in raw_buffers:
+            file.write(b"\0" * (-file.tell() % BUFFER_ALIGNMENT))
+            file.write(buffer)
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(data: mmap.mmap, expected_hash: str) -> Optional[dict]:
+    """The unpickled content of a mapped snapshot file, or None if it is stale or corrupt."""
+    # Slices of this view handed out to the index keep the mapping alive
+    view = memoryview(data)
+    try:
+        if bytes(view[:len(SNAPSHOT_MAGIC)]) != SNAPSHOT_MAGIC:
+            return None
+        offset = len(SNAPSHOT_MAGIC)
+        (header_length,) = struct.unpack_from("<I", view, offset)
+        offset += 4
+        header = json.loads(bytes(view[offset:offset + header_length]))
+        offset += header_length
+        if header.get("version") != SNAPSHOT_VERSION or header.get("content_hash") != expected_hash:
+            return None
+
+        payload = view[offset:offset + header["payload_length"]]
+        offset += header["payload_length"]
+        buffers = []
+        for length in header["buffer_lengths"]:
+            offset += -offset % BUFFER_ALIGNMENT
+            buffers.append(view[offset:offset + length])
+            offset += length
+        if offset > len(view):  # truncated
+            return None
+    except (struct.error, ValueError, AttributeError, KeyError, TypeError):
+        # Garbage header: not JSON, not an object or missing fields
+        return None
+
+    # The payload is a large graph of small objects; the cyclic GC has nothing to
+    # collect while it is being built, only overhead.
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return pickle.loads(payload, buffers=buffers)
+    except Exception:
+        # A corrupt payload can fail in many ways (UnpicklingError, EOFError, ...)
+        return None
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+def load_snapshot(path: str, filenames: Dict[str, str], tries: Dict[str, Trie],
+                  variation_map: Optional[Dict[str, dict]] = None) -> bool:
+    """
+    Fill tries (and variation_map, if given) from the snapshot at path; the tries keep
+    the StringTable they were built with as Trie.strings. Returns False,
+    leaving both untouched, when the snapshot is missing, unreadable or was built from
+    other list files.
+    """
+    if not path or not os.path.exists(path):
+        return False
+
+    try:
+        expected_hash = content_hash(filenames)
+    except FileNotFoundError:
+        return False
+
+    try:
+        with open(path, "rb") as file:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):  # ValueError: empty file
+        return False
+
+    snapshot = read_snapshot(data, expected_hash)
+    if snapshot is None:
+        # Nothing refers to the mapping any more
+        data.close()
+        return False
+
+    for category, trie in snapshot["tries"].items():
+        trie.build_automaton()
+        tries[category] = trie
+    if variation_map is not None:
+        variation_map.update(snapshot["variation_map"])
+    return True
+
+
+def build_snapshot(filenames: Dict[str, str], path: str) -> Dict[str, Trie]:
+    tries = {}
+    variation_map = {}
+    # The table is pickled once, with the tries that refer to it
+    load_databases(filenames, tries, variation_map, StringTable())
+    for trie in tries.values():
+        build_deletion_index(trie)
+    save_snapshot(path, filenames, tries, variation_map)
+    return tries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the prebuilt index snapshot")
+    parser.add_argument("--data-dir", default=".", help="directory containing the list_*.txt files")
+    parser.add_argument("--output", default=DEFAULT_SNAPSHOT_PATH, help="snapshot file to write")
+    args = parser.parse_args()
+
+    filenames = {category: os.path.join(args.data_dir, f"list_{category}.txt")
+                 for category in ("province", "district", "ward")}
+    start = time.perf_counter()
+    build_snapshot(filenames, args.output)
+    print(f"Built {args.output} in {time.perf_counter() - start:.2f}s "
+          f"({os.path.getsize(args.output) / 1e6:.1f} MB)")
+
+    start = time.perf_counter()
+    load_snapshot(args.output, filenames, {})
+    print(f"Loading it takes {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
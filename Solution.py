@@ -1,49 +1,324 @@
-from IndexAnalyzer import load_databases, variation_map
-from Searcher import search_locations_in_trie, search_locations_in_segments
-from Utils import normalize_text_but_keep_accent, segment_text
+import gc
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from collections import deque
+from functools import partial
+from itertools import islice
+
+from Autocorrect import (COSINE_SIMILARITY_THRESHOLD, COSINE_SIMILARITY_THRESHOLD_NUM, MAX_VALID_EDIT_DISTANCE,
+                         AutocorrectConfig, build_deletion_index)
+from Cache import BatchMemo, LRUCache
+from Lattice import LatticeDecoder, decode_locations
+from Metrics import Instrumentation, RequestStats
+from IndexAnalyzer import CompactTrie, ExactIndex, LazyTrie, load_category, load_databases, load_hierarchy
+from LiveIndex import DEFAULT_REBUILD_THRESHOLD, AddressIndex, Gazetteer, read_names
+from Searcher import Deadline, raw_name, search_exact, search_locations_in_trie, search_locations_in_segments
+from Snapshot import DEFAULT_SNAPSHOT_PATH, load_snapshot
+from StringTable import StringTable
+from Utils import clip_text, normalize_text_but_keep_accent, segment_text
+
+# Categories that Solution(lazy=True) builds on first use instead of at startup
+LAZY_CATEGORIES = ("district", "ward")
+
+# Solution(guard=True): only the end of longer inputs is read (administrative units are
+# written last), and the fuzzy fallback tries at most the last GUARD_MAX_SEGMENTS
+# segments, so the work per request is bounded whatever the input
+GUARD_MAX_INPUT_CHARS = 256
+GUARD_MAX_SEGMENTS = 10
+
+PARENT_CHECK_INTERVAL = 1.0  # seconds between a forked worker's checks that its parent is alive
+
+# Solution used by forked batch workers. Each worker sets it once, from the pool's
+# initializer, to the instance it inherited with the fork; the parent never sets it,
+# so batches of different instances can run at the same time.
+_worker_solution = None
+# Serializes the gc.freeze / fork / gc.unfreeze sequence of fork_executor
+_fork_lock = threading.Lock()
+
+def _init_worker(solution, parent_pid):
+    global _worker_solution
+    _worker_solution = solution
+    threading.Thread(target=_exit_with_parent, args=(parent_pid,), daemon=True).start()
+
+def _exit_with_parent(parent_pid):
+    # A worker whose parent was killed (SIGKILL, OOM killer) would live on with its copy of
+    # the index; once reparented, getppid() no longer returns the parent
+    while os.getppid() == parent_pid:
+        time.sleep(PARENT_CHECK_INTERVAL)
+    os._exit(1)
+
+def _process_in_worker(s: str):
+    return _worker_solution.process(s)
+
+def _process_chunk_in_worker(addresses):
+    return [_worker_solution.process(s) for s in addresses]
+
+def fork_executor(solution, workers: int) -> ProcessPoolExecutor:
+    """
+    ProcessPoolExecutor whose forked workers share solution's index copy-on-write.
+    The caller owns the executor and must shut it down; workers call
+    _process_in_worker / _process_chunk_in_worker.
+    """
+    with _fork_lock:
+        # Move everything alive now (the index above all) out of the GC's reach, so
+        # collections in the workers do not touch, and thereby copy, the shared pages.
+        gc.collect()
+        gc.freeze()
+        try:
+            # With fork the initializer's arguments are inherited, not pickled
+            executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork"),
+                                           initializer=_init_worker, initargs=(solution, os.getpid()))
+            # Start every worker now, while the heap is frozen
+            for future in [executor.submit(os.getpid) for _ in range(workers)]:
+                future.result()
+        finally:
+            gc.unfreeze()
+    return executor
+
+
+def gil_enabled() -> bool:
+    """False only on a free-threaded CPython build running without the GIL."""
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+    return is_gil_enabled() if is_gil_enabled is not None else True
+
 
 class Solution:
 
     debug = False
 
-    def __init__(self):
+    def __init__(self, compact=False, hierarchy_path=None,
+                 cache_size=0, segment_cache_size=0, cache_max_bytes=None, cache_ttl=None,
+                 instrument=False, data_dir=None, snapshot_path=DEFAULT_SNAPSHOT_PATH, budget=None,
+                 cosine_threshold=COSINE_SIMILARITY_THRESHOLD, cosine_threshold_num=COSINE_SIMILARITY_THRESHOLD_NUM,
+                 max_edit_distance=MAX_VALID_EDIT_DISTANCE, prefilter=True, tail_match=True, engine="cascade",
+                 rebuild_threshold=DEFAULT_REBUILD_THRESHOLD, lazy=False, exact_match=True, intern_strings=True,
+                 guard=False):
         # list provice, district, ward for private test, do not change for any reason (these file will be provided later with this exact name)
 
         self.province_path = 'list_province.txt'
         self.district_path = 'list_district.txt'
         self.ward_path = 'list_ward.txt'
 
-        self.tries = {}
-        load_databases({
+        # Same file names from another directory, e.g. vietnamese-provinces-database
+        if data_dir:
+            self.province_path = os.path.join(data_dir, self.province_path)
+            self.district_path = os.path.join(data_dir, self.district_path)
+            self.ward_path = os.path.join(data_dir, self.ward_path)
+
+        # Prebuilt index from `python Snapshot.py`, used only if it matches the list files.
+        # None always builds from the list files.
+        self.snapshot_path = snapshot_path
+
+        filenames = {
             "province": self.province_path,
             "district": self.district_path,
             "ward": self.ward_path
-        }, self.tries)
+        }
+        self.filenames = filenames
+        # Autocorrect tuning (see Autocorrect.py); the deletion index must cover max_edit_distance
+        self.autocorrect_config = AutocorrectConfig(cosine_threshold, cosine_threshold_num, max_edit_distance, prefilter)
+        index_distance = max(max_edit_distance, MAX_VALID_EDIT_DISTANCE)
 
-        self.variation_map = variation_map
-        pass
+        # With lazy, only the small province index is built now (without the snapshot).
+        # District and ward become LazyTries built on first use, their deletion indexes
+        # on the first autocorrect and each hierarchy region when it is first searched,
+        # so a worker that only sees a few provinces never builds the rest.
+        lazy_categories = LAZY_CATEGORIES if lazy else ()
+        tries = {}
+        variation_map = {category: {} for category in filenames}
+        # Names and variants are stored once, in one table (StringTable.py)
+        strings = StringTable() if intern_strings else None
+        if lazy or not load_snapshot(self.snapshot_path, filenames, tries, variation_map):
+            load_databases({category: filename for category, filename in filenames.items()
+                            if category not in lazy_categories}, tries, variation_map, strings)
+        else:
+            strings = tries["province"].strings
+        # Snapshots already carry the index, unless it is too small for max_edit_distance
+        for trie in tries.values():
+            if trie.deletion_index is None or trie.deletion_index.max_distance < index_distance:
+                build_deletion_index(trie, index_distance)
+        for category in lazy_categories:
+            tries[category] = LazyTrie(partial(load_category, filenames[category], category, variation_map, strings),
+                                       compact)
 
-    def process(self, s: str):
-        # Preprocess
-        s_copy = s[:]
+        # Optional province -> district -> ward links (see IndexAnalyzer.load_hierarchy).
+        # Once a parent is found, its children are the only candidates searched.
+        regions = load_hierarchy(hierarchy_path, lazy, compact, strings) if hierarchy_path else None
 
-        segments = segment_text(s)
-        input_text = normalize_text_but_keep_accent(",".join(segments))
+        # Array-backed tries: same lookups, several times less memory per worker
+        if compact:
+            tries = {category: trie if isinstance(trie, LazyTrie) else CompactTrie(trie)
+                     for category, trie in tries.items()}
+            if regions and not lazy:
+                regions = {category: {parent: CompactTrie(trie) for parent, trie in by_parent.items()}
+                           for category, by_parent in regions.items()}
+        self.compact = compact
+        self.lazy = lazy
 
-        # Start searching
-        results = {"ward": "", "district": "", "province": ""}
+        # Optional caches: whole results keyed by the normalized address, and autocorrect
+        # results keyed by (segment, category). Sizes of 0 disable them.
+        self.cache_settings = (cache_size, segment_cache_size, cache_max_bytes, cache_ttl)
 
-        # Search with accents
-        result, remaining_text = search_locations_in_trie(self.tries, input_text, results)
+        # Opt-in per-stage timings and counters (Metrics.Instrumentation); when off,
+        # process only pays for a few `stats is not None` checks.
+        self.instrumentation = Instrumentation() if instrument else None
 
-        segments = segment_text(remaining_text, False)
-        result, remaining_text = search_locations_in_segments(self.tries, segments, results)
+        # Default time budget of process in seconds (None: no deadline)
+        self.budget = budget
 
-        result =  {
-            "province": self.tries["province"].get_raw_text(result["province"]),
-            "district": self.tries["district"].get_raw_text(result["district"]),
-            "ward": self.tries["ward"].get_raw_text(result["ward"]),
-        }
+        # Bound the work per request by the input size (GUARD_MAX_INPUT_CHARS, GUARD_MAX_SEGMENTS);
+        # `python -m benchmarks.LatencyFuzzer` searches for the slowest inputs
+        self.guard = guard
+
+        # Find the province right to left from the end of the address (Searcher.search_tail)
+        self.tail_match = tail_match
+
+        # Exact matching engine: "cascade" searches one category after the other,
+        # "lattice" decodes all three jointly (see Lattice.py)
+        if engine not in ("cascade", "lattice"):
+            raise ValueError(f"Unknown engine {engine!r}, expected 'cascade' or 'lattice'")
+        self.engine = engine
+        lattice = LatticeDecoder(tries, compact) if engine == "lattice" else None
+
+        # Hash index of every variant, tried before the tries (Searcher.search_exact):
+        # addresses whose last segments are exactly the province, district and ward
+        # names skip the trie and fuzzy searches altogether
+        exact = ExactIndex(tries) if exact_match else None
+
+        # Everything process reads, replaced as a whole by updates (see LiveIndex.py)
+        self.index = AddressIndex(tries, variation_map, regions, lattice, *self.new_caches(), exact)
+        # Incremental add/remove/rename of locations; writers take update_lock, readers never do
+        self.update_lock = threading.Lock()
+        self.gazetteer = Gazetteer(tries, {category: read_names(filename) for category, filename in filenames.items()},
+                                   variation_map, index_distance, compact, rebuild_threshold, strings)
+        # Everything is interned by now; lazy loads and updates rebuild the lookup on demand
+        self.strings = strings
+        if strings is not None:
+            strings.seal()
+
+    @property
+    def tries(self):
+        return self.index.tries
+
+    @property
+    def variation_map(self):
+        return self.index.variation_map
+
+    @property
+    def regions(self):
+        return self.index.regions
+
+    @property
+    def lattice(self):
+        return self.index.lattice
+
+    @property
+    def result_cache(self):
+        return self.index.result_cache
+
+    @property
+    def segment_cache(self):
+        return self.index.segment_cache
+
+    def new_caches(self):
+        cache_size, segment_cache_size, cache_max_bytes, cache_ttl = self.cache_settings
+        result_cache = LRUCache(cache_size, cache_max_bytes, cache_ttl) if cache_size > 0 else None
+        segment_cache = LRUCache(segment_cache_size, cache_max_bytes, cache_ttl) if segment_cache_size > 0 else None
+        return result_cache, segment_cache
+
+    def apply_changes(self, category, added=(), removed=()) -> int:
+        """
+        Add and remove location names of one category ("province", "district" or "ward")
+        and publish the new index version; returns its version number. Only the changed
+        names are indexed, so this takes milliseconds, and concurrent process calls keep
+        the version they started with. Not supported with a hierarchy file, whose
+        regional tries cannot follow the changed names.
+        """
+        self.check_updatable()
+        with self.update_lock:
+            return self.publish(category, self.gazetteer.apply(category, added, removed))
+
+    def add_location(self, category, name) -> int:
+        return self.apply_changes(category, added=[name])
+
+    def remove_location(self, category, name) -> int:
+        return self.apply_changes(category, removed=[name])
+
+    def rename_location(self, category, old_name, new_name) -> int:
+        return self.apply_changes(category, added=[new_name], removed=[old_name])
+
+    def reload(self, category, path=None) -> int:
+        """Apply the difference between the current names of category and its list file (or path)."""
+        self.check_updatable()
+        names = read_names(path or self.filenames[category])
+        with self.update_lock:
+            return self.publish(category, self.gazetteer.replace(category, names))
+
+    def rebuild_index(self, category) -> int:
+        """Fold the pending changes of category into a fresh base trie (done automatically past rebuild_threshold)."""
+        with self.update_lock:
+            return self.publish(category, self.gazetteer.rebuild(category))
+
+    def check_updatable(self):
+        # A hierarchy row says where a ward or district sits, a name change does not,
+        # so the regional tries would keep answering with removed or renamed names
+        if self.index.regions:
+            raise ValueError("Live updates are not supported with a hierarchy file, "
+                             "create a new Solution from the updated files instead")
+
+    def publish(self, category, trie) -> int:
+        # Called with update_lock held; caches start empty as their answers may be stale
+        index = self.index
+        if trie is None:
+            return index.version
+        tries = dict(index.tries)
+        tries[category] = trie
+        variation_map = dict(index.variation_map)
+        variation_map[category] = dict(self.gazetteer.state(category).variations)
+        # The lattice only indexes the changed words (LatticeDecoder.layered)
+        lattice = index.lattice.layered(tries) if index.lattice is not None else None
+        # The exact index stays: the replaced trie is no longer the one it was built
+        # from, so that category is answered by the new trie's word sets
+        self.index = AddressIndex(tries, variation_map, index.regions, lattice, *self.new_caches(), index.exact,
+                                  version=index.version + 1)
+        return self.index.version
+
+    def process(self, s: str, budget=None):
+        """
+        Classify one address. With a time budget in seconds (here or Solution(budget=...)),
+        the fuzzy fallback stops once it is spent and the result also lists the
+        "resolved" fields and the ones "cut_off" by the deadline; exact matches are always tried.
+        """
+        if budget is None:
+            budget = self.budget
+        deadline = Deadline(budget) if budget is not None else None
+        stats = RequestStats() if self.instrumentation is not None else None
+        # One version of the index for the whole call, even if an update is published meanwhile
+        index = self.index
+
+        # Preprocess
+        s_copy = s[:]
+        input_text = self.normalize(s)
+        if stats is not None:
+            stats.lap("segment")
+
+        # Everything below depends only on input_text
+        if index.result_cache is not None:
+            cached = index.result_cache.get(input_text)
+            if cached is not None:
+                if stats is not None:
+                    stats.cache_hit = True
+                    self.instrumentation.record(stats, time.perf_counter() - stats.started)
+                result = dict(cached)
+                if deadline is not None:
+                    self.add_resolution(result, deadline)
+                return result
+
+        result = self.search(index, input_text, deadline, stats, index.segment_cache)
 
         if self.debug:
             print()
@@ -51,4 +326,180 @@ class Solution:
             print(f"Normalized: {normalize_text_but_keep_accent(s_copy)}")
             print(f"Result: {result}")
 
+        # Partial answers are not cached, a later call with more time may do better
+        if index.result_cache is not None and not (deadline is not None and deadline.cut_off):
+            index.result_cache.put(input_text, dict(result))
+        if deadline is not None:
+            self.add_resolution(result, deadline)
+        if stats is not None:
+            stats.lap("finalize")
+            self.instrumentation.record(stats, time.perf_counter() - stats.started)
         return result
+
+    def normalize(self, s: str) -> str:
+        """The normalized, comma-separated segments of an address that the search works on."""
+        if self.guard:
+            s = clip_text(s, GUARD_MAX_INPUT_CHARS)
+        return normalize_text_but_keep_accent(",".join(segment_text(s)))
+
+    def search(self, index: AddressIndex, input_text: str, deadline=None, stats=None, segment_cache=None):
+        """
+        Raw names found in a normalized address: the exact, trie and fuzzy stages of process.
+        segment_cache holds autocorrect results and may be shared by many calls.
+        """
+        # Start searching
+        results = {"ward": "", "district": "", "province": ""}
+
+        # Exact segments first (Searcher.search_exact): on a full hit the trie and fuzzy
+        # searches are skipped, on a partial one the cascade only searches the text
+        # before the segments found. The lattice decodes whole addresses, so it only
+        # takes full hits.
+        remaining_text, complete = input_text, False
+        if index.exact is not None:
+            seeded = dict(results)
+            seeded, text, complete = search_exact(index.exact, index.tries, input_text, seeded, index.regions, stats)
+            if complete or index.lattice is None:
+                results, remaining_text = seeded, text
+            if stats is not None:
+                stats.exact_hit = complete
+                stats.lap("exact")
+
+        # Search with accents
+        if complete:
+            result = results
+        elif index.lattice is not None:
+            if stats is not None:
+                stats.trie_chars += len(remaining_text)
+            result, remaining_text = decode_locations(index.lattice, remaining_text, results)
+        else:
+            result, remaining_text = search_locations_in_trie(index.tries, remaining_text, results, index.regions,
+                                                              stats, self.tail_match)
+        if stats is not None:
+            stats.lap("trie_search")
+
+        if not complete:
+            segments = segment_text(remaining_text, False)
+            if self.guard:
+                segments = segments[-GUARD_MAX_SEGMENTS:]
+            if stats is not None:
+                stats.lap("resegment")
+            result, remaining_text = search_locations_in_segments(index.tries, segments, results, index.regions,
+                                                                  segment_cache, stats, deadline,
+                                                                  self.autocorrect_config)
+            if stats is not None:
+                stats.lap("fuzzy_search")
+
+        return {
+            "province": raw_name(index.tries, "province", result, index.regions),
+            "district": raw_name(index.tries, "district", result, index.regions),
+            "ward": raw_name(index.tries, "ward", result, index.regions),
+        }
+
+    @staticmethod
+    def add_resolution(result, deadline: Deadline):
+        result["resolved"] = [category for category in ("province", "district", "ward") if result[category]]
+        result["cut_off"] = list(deadline.cut_off)
+
+    def cache_stats(self):
+        """Hits, misses, evictions and sizes of the result and segment caches (None when disabled)."""
+        return {
+            "result": self.result_cache.stats() if self.result_cache is not None else None,
+            "segment": self.segment_cache.stats() if self.segment_cache is not None else None,
+        }
+
+    def iter_batch(self, addresses, workers=None, chunksize=256, mode=None):
+        """
+        Like process_batch, but yields results lazily (still in input order) and
+        consumes the input as it goes, so it can be used on unbounded streams.
+        """
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if mode is None:
+            mode = "process" if gil_enabled() else "thread"
+        if mode not in ("process", "thread"):
+            raise ValueError(f"Unknown mode {mode!r}, expected 'process' or 'thread'")
+        if workers > 1 and mode == "thread":
+            yield from self.iter_threaded(addresses, workers, chunksize)
+            return
+        if workers <= 1 or "fork" not in multiprocessing.get_all_start_methods():
+            for s in addresses:
+                yield self.process(s)
+            return
+
+        executor = fork_executor(self, workers)
+        try:
+            # Feed the pool one window at a time, keeping two windows in flight, so
+            # the input is not read further ahead than that
+            addresses = iter(addresses)
+            window = workers * chunksize * 2
+            pending = deque()
+            while True:
+                block = list(islice(addresses, window))
+                if not block:
+                    break
+                pending.append(executor.map(_process_in_worker, block, chunksize=chunksize))
+                if len(pending) > 1:
+                    yield from pending.popleft()
+            while pending:
+                yield from pending.popleft()
+        finally:
+            executor.shutdown(cancel_futures=True)
+
+    def iter_threaded(self, addresses, workers, chunksize):
+        # The index is immutable and all per-request state is local to process, so
+        # threads share this instance as is
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            addresses = iter(addresses)
+            pending = deque()
+            while True:
+                chunk = list(islice(addresses, chunksize))
+                if not chunk:
+                    break
+                pending.append(executor.submit(self.process_chunk, chunk))
+                # Two chunks per thread in flight bound how far the input is read ahead
+                if len(pending) >= 2 * workers:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+
+    def process_chunk(self, addresses):
+        return [self.process(s) for s in addresses]
+
+    def process_batch(self, addresses, workers=None, chunksize=256, mode=None):
+        """
+        Process many addresses in parallel; results are returned in input order.
+        mode="process" uses forked workers sharing this instance's index copy-on-write,
+        mode="thread" a thread pool sharing this instance (it only scales on
+        free-threaded CPython builds, where it is the default). workers defaults to
+        the number of CPUs; workers=1 processes in the calling thread.
+        """
+        return list(self.iter_batch(addresses, workers, chunksize, mode))
+
+    def process_deduplicated(self, addresses):
+        """
+        Classify a batch in this process, sharing the work between its addresses: each
+        distinct address is normalized and classified once, and each distinct segment
+        left to the fuzzy search is autocorrected once per category for the whole batch.
+        Gives the results of [process(s) for s in addresses], without the result and
+        segment caches or the instrumentation. Memory grows with the distinct segments
+        of the batch, so split unbounded input into batches.
+        """
+        index = self.index
+        segment_cache = BatchMemo()
+        by_address, by_text = {}, {}
+        results = []
+        for s in addresses:
+            result = by_address.get(s)
+            if result is None:
+                input_text = self.normalize(s)
+                result = by_text.get(input_text)
+                if result is None:
+                    deadline = Deadline(self.budget) if self.budget is not None else None
+                    result = self.search(index, input_text, deadline, None, segment_cache)
+                    if deadline is not None:
+                        self.add_resolution(result, deadline)
+                    by_text[input_text] = result
+                by_address[s] = result
+            # Rows of duplicates must not share the resolved / cut_off lists either
+            results.append({key: list(value) if isinstance(value, list) else value for key, value in result.items()})
+        return results
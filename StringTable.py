@@ -0,0 +1,60 @@
+# Interned string table shared by everything one Solution indexes
+# Raw location names, their normalized, accent-folded, prefixed and acronym variants,
+# and the NFKD keys of the SymSpell indexes are each stored once and numbered; the
+# tries, original_names, variation_map, deletion indexes and gazetteer names all
+# refer to that one object instead of building their own copy of the same text.
+# CompactTrie keeps the table ids in its terminal array and reads the words back from
+# the shared list (StringTable.strings) instead of a word list per trie.
+#
+# The str -> id dictionary is only needed while strings are being added; seal()
+# drops it once the index is built and it is rebuilt on the next id() (lazy tries,
+# live updates). `python -m benchmarks.StringTableReport` shows what it saves.
+
+####################################################################
+import threading
+from typing import Dict, Iterable, List, Optional
+
+
+class StringTable:
+
+    def __init__(self, strings: Iterable[str] = ()):
+        self.strings: List[str] = list(strings)
+        self._ids: Optional[Dict[str, int]] = None
+        self._lock = threading.Lock()
+
+    def __reduce__(self):
+        return StringTable, (self.strings,)
+
+    def __len__(self):
+        return len(self.strings)
+
+    def __getitem__(self, string_id: int) -> str:
+        return self.strings[string_id]
+
+    def id(self, string: str) -> int:
+        """The id of string, numbering it if it is new."""
+        ids = self._ids
+        if ids is not None:
+            string_id = ids.get(string)
+            if string_id is not None:
+                return string_id
+        with self._lock:
+            if self._ids is None:
+                self._ids = {s: i for i, s in enumerate(self.strings)}
+            string_id = self._ids.get(string)
+            if string_id is None:
+                string_id = self._ids[string] = len(self.strings)
+                self.strings.append(string)
+            return string_id
+
+    def intern(self, string: str) -> str:
+        """The table's copy of string (string itself if it is new)."""
+        return self.strings[self.id(string)]
+
+    def intern_all(self, strings: Iterable[str]) -> List[str]:
+        return [self.strings[self.id(string)] for string in strings]
+
+    def seal(self):
+        """Drop the lookup dictionary until the next id(); the strings and their ids stay."""
+        with self._lock:
+            self._ids = None
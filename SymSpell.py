@@ -0,0 +1,188 @@
+# Symmetric-delete candidate index (SymSpell) for Autocorrect
+# Every word is stored under all strings reachable by deleting up to max_distance
+# characters from its prefix, so a query only has to generate its own deletes and
+# verify the few words that share one of them instead of scanning the whole list.
+# Words are compared in NFKD form, the same form Autocorrect uses for edit distance.
+#
+# may_match is a lossless prefilter in front of lookup: a word within edit distance d
+# of the query keeps at least len(query) - d of its characters, so a query that cannot
+# share that many characters (counted with multiplicity) with any word of a nearby
+# length has no match and skips the delete generation and verification.
+
+####################################################################
+import math
+import pickle
+import unicodedata
+from array import array
+from collections import Counter
+from typing import Dict, Iterable, List, Set, Tuple
+
+import editdistance
+
+PREFIX_LENGTH = 7
+
+
+def generate_deletes(word: str, max_distance: int) -> Set[str]:
+    """All strings reachable by deleting at most max_distance characters from word."""
+    deletes = {word}
+    frontier = [word]
+    for _ in range(max_distance):
+        next_frontier = []
+        for candidate in frontier:
+            if len(candidate) == 0:
+                continue
+            for i in range(len(candidate)):
+                deleted = candidate[:i] + candidate[i + 1:]
+                if deleted not in deletes:
+                    deletes.add(deleted)
+                    next_frontier.append(deleted)
+        frontier = next_frontier
+    return deletes
+
+
+class DeletionIndex:
+
+    def __init__(self, words: Iterable[str], max_distance: int, prefix_length: int = PREFIX_LENGTH, strings=None):
+        # Keep the iteration order of the source words so ties come out in the same
+        # order as a linear scan over them.
+        self.words: List[str] = list(words)
+        self.keys: List[str] = [unicodedata.normalize("NFKD", w) for w in self.words]
+        if strings is not None:
+            # Shared with the other indexes holding the same word (StringTable)
+            self.keys = strings.intern_all(self.keys)
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+
+        buckets: Dict[str, List[int]] = {}
+        for word_id, key in enumerate(self.keys):
+            for deleted in generate_deletes(key[:prefix_length], max_distance):
+                bucket = buckets.get(deleted)
+                if bucket is None:
+                    buckets[deleted] = [word_id]
+                else:
+                    bucket.append(word_id)
+
+        # Flatten the buckets: deletes maps a key to its bucket number, and the word ids
+        # of bucket b are ids[offsets[b]:offsets[b + 1]].
+        self.deletes: Dict[str, int] = {}
+        self.offsets = array("I", [0])
+        self.ids = array("I")
+        for bucket_id, (deleted, bucket) in enumerate(buckets.items()):
+            self.deletes[deleted] = bucket_id
+            self.ids.extend(bucket)
+            self.offsets.append(len(self.ids))
+
+        self.char_limits = build_char_limits(self.keys, max_distance)
+        self.char_weights = build_char_weights(self.words)
+
+    def may_match(self, query: str, max_distance: int) -> bool:
+        """
+        False when no word can be within max_distance of query (NFKD); True means "maybe".
+        Never rejects a query that lookup would find a word for.
+        """
+        limits = self.char_limits[len(query)] if len(query) < len(self.char_limits) else None
+        if limits is None:
+            return False
+        shared = 0
+        for char, count in Counter(query).items():
+            limit = limits.get(char)
+            if limit is not None:
+                shared += count if count < limit else limit
+        return shared >= len(query) - max_distance
+
+    def __reduce__(self):
+        # The id arrays go out as pickle buffers so a snapshot can map them from disk
+        return (_restore_index, (self.words, self.keys, self.max_distance, self.prefix_length,
+                                 list(self.deletes), pickle.PickleBuffer(self.offsets), pickle.PickleBuffer(self.ids),
+                                 self.char_limits, self.char_weights))
+
+    def lookup(self, word: str, max_distance: int, stats=None, exclude=None) -> Tuple[int, List[str]]:
+        """
+        Return (best_distance, words) for all indexed words at the minimal edit
+        distance from word, provided that distance is at most max_distance.
+        stats (a Metrics.RequestStats) counts the edit distances computed; words in
+        exclude (removed from a live index, see LiveIndex.py) are skipped.
+        """
+        if max_distance > self.max_distance:
+            raise ValueError(f"Index was built for max_distance={self.max_distance}, got {max_distance}")
+
+        query = unicodedata.normalize("NFKD", word)
+        candidate_ids = set()
+        for deleted in generate_deletes(query[:self.prefix_length], max_distance):
+            bucket_id = self.deletes.get(deleted)
+            if bucket_id is not None:
+                candidate_ids.update(self.ids[self.offsets[bucket_id]:self.offsets[bucket_id + 1]])
+
+        best_distance = max_distance
+        best_ids = []
+        query_length = len(query)
+        for word_id in candidate_ids:
+            key = self.keys[word_id]
+            if abs(len(key) - query_length) > best_distance:
+                continue
+            if exclude and self.words[word_id] in exclude:
+                continue
+            distance = editdistance.distance(query, key)
+            if stats is not None:
+                stats.edit_distance_calls += 1
+            if distance < best_distance:
+                best_distance = distance
+                best_ids = [word_id]
+            elif distance == best_distance:
+                best_ids.append(word_id)
+
+        best_ids.sort()
+        return best_distance, [self.words[word_id] for word_id in best_ids]
+
+
+def build_char_limits(keys: List[str], max_distance: int) -> List[Dict[str, int]]:
+    """
+    For each query length n (up to the longest key + max_distance), the highest count
+    of every character in keys whose length is within max_distance of n.
+    """
+    by_length: Dict[int, Counter] = {}
+    for key in keys:
+        limits = by_length.setdefault(len(key), Counter())
+        limits |= Counter(key)  # element-wise max
+
+    longest = max(by_length, default=-1)
+    char_limits = []
+    for n in range(longest + max_distance + 1):
+        limits = Counter()
+        for length in range(max(0, n - max_distance), n + max_distance + 1):
+            if length in by_length:
+                limits |= by_length[length]
+        char_limits.append(dict(limits))
+    return char_limits
+
+
+def build_char_weights(words: List[str]) -> Dict[str, float]:
+    """
+    Highest share of each character in a word's count vector, count / norm, over the
+    words as written. The cosine of a query q with any word is at most
+    sum(q[c] * weight[c]) / |q|, which is what Autocorrect's prefilter checks.
+    """
+    weights: Dict[str, float] = {}
+    for word in words:
+        counts = Counter(word)
+        norm = math.sqrt(sum(count * count for count in counts.values()))
+        for char, count in counts.items():
+            if count / norm > weights.get(char, 0.0):
+                weights[char] = count / norm
+    return weights
+
+
+def _restore_index(words, keys, max_distance, prefix_length, deleted_keys, offsets, ids,
+                   char_limits, char_weights) -> DeletionIndex:
+    index = DeletionIndex.__new__(DeletionIndex)
+    index.words = words
+    index.keys = keys
+    index.max_distance = max_distance
+    index.prefix_length = prefix_length
+    index.deletes = dict(zip(deleted_keys, range(len(deleted_keys))))
+    # Buffers come back as bytes or as read-only views over a memory-mapped file
+    index.offsets = memoryview(offsets).cast("B").cast("I")
+    index.ids = memoryview(ids).cast("B").cast("I")
+    index.char_limits = char_limits
+    index.char_weights = char_weights
+    return index
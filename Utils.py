@@ -40,45 +40,80 @@ wrong_accents = {
     "qui": "quy",
 }
 
+# Every prefix list is compiled once into a single alternation. Alternatives keep the
+# list order, so at each position the earlier entry wins, like the old loop of
+# re.sub calls, but the text is scanned only once.
+# The only way the two can differ is when entries overlap without one containing the
+# other. For SAFE_CASES that never happens. In ALL_PREFIXES it only happens through
+# the entries with spaces (" TP" and " P " share a space, ",Q " appears after " T "
+# is replaced), so text with spaces still goes through the per-entry patterns.
+def compile_cases(cases):
+    return re.compile("|".join(re.escape(case) for case in cases), flags=re.IGNORECASE)
+
+SAFE_CASES_PATTERN = compile_cases(SAFE_CASES)
+ALL_PREFIXES_PATTERN = compile_cases(ALL_PREFIXES)
+ALL_PREFIXES_PATTERNS = [compile_cases([case]) for case in ALL_PREFIXES]
+MULTI_SPACE_PATTERN = re.compile(r"\s{2,}")
+SEPARATOR_PATTERN = re.compile(r"[,\s]")
+WRONG_ACCENTS_PATTERN = re.compile("|".join(re.escape(wrong) for wrong in wrong_accents))
+
+
+class AccentFoldingTable(dict):
+    """
+    str.translate table that removes accents. NFKD + dropping combining marks works
+    character by character, so each character's folded form is computed once and cached.
+    """
+    def __missing__(self, char_code):
+        decomposed = unicodedata.normalize("NFKD", chr(char_code)).replace("đ", "d")
+        folded = "".join(c for c in decomposed if not unicodedata.combining(c))
+        self[char_code] = folded
+        return folded
+
+ACCENT_FOLDING_TABLE = AccentFoldingTable()
+
+
 def common_normalize(text: str) -> str:
     text = text.lower()
     # text = text.replace(",", "")  # replace for T,â,n,B,ì,n,h Dĩ An Bình Dương
     # text = text.replace(".", "")
-    for case in SAFE_CASES:
-        text = re.sub(re.escape(case), ',', text, flags=re.IGNORECASE)
-    text = re.sub(r"\s{2,}", ",", text)  # Remove spaces
+    text = SAFE_CASES_PATTERN.sub(",", text)
+    text = MULTI_SPACE_PATTERN.sub(",", text)  # Remove spaces
     text = text.replace(" ", "")
     return text
 
+def remove_accent(text: str) -> str:
+    return text.translate(ACCENT_FOLDING_TABLE)
+
 def normalize_text_and_remove_accent(text: str) -> str:
     """Normalize text by removing accents, spaces, and special cases."""
-    text = common_normalize(text)
-    text = unicodedata.normalize("NFKD", text)
-    text = text.replace("đ", "d")
-    text = "".join(c for c in text if not unicodedata.combining(c))  # Remove accents
-    # text = re.sub(r"\s+", "", text)  # Remove spaces
-    return text
+    return remove_accent(common_normalize(text))
 
 def normalize_text_but_keep_accent(text: str) -> str:
     """Normalize text by removing accents, spaces, and special cases."""
     text = common_normalize(text)
     text = unicodedata.normalize("NFKC", text)
+    return WRONG_ACCENTS_PATTERN.sub(lambda m: wrong_accents[m.group(0)], text)
 
-    for wrong, correct in wrong_accents.items():
-        text = text.replace(wrong, correct)
-
-    return text
+def clip_text(s: str, max_chars: int) -> str:
+    """The last max_chars characters of s, from the first separator on so no name is cut in half."""
+    if len(s) <= max_chars:
+        return s
+    tail = s[-max_chars:]
+    separator = SEPARATOR_PATTERN.search(tail)
+    return tail[separator.end():] if separator else tail
 
 def segment_text(s, safe=True):
-    text = s[:]
-
-    prefixes = SAFE_CASES if safe else ALL_PREFIXES
-
-    for p in prefixes:
-        text = re.sub(re.escape(p), ',', text, flags=re.IGNORECASE)
+    if safe:
+        text = SAFE_CASES_PATTERN.sub(",", s)
+    elif " " not in s:
+        text = ALL_PREFIXES_PATTERN.sub(",", s)
+    else:
+        text = s
+        for pattern in ALL_PREFIXES_PATTERNS:
+            text = pattern.sub(",", text)
 
     # Xử lý dấu "-" trong tên (ví dụ: "Ng-T-" -> "Ng T ")
-    text = re.sub(r'[.]', ' ', text)
+    text = text.replace(".", " ")
 
     # Tách cụm địa chỉ
     segments = [seg.strip() for seg in text.split(',') if seg.strip()]
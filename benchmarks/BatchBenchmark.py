@@ -0,0 +1,67 @@
+# Throughput of Solution.process_batch against the number of workers
+# public.json is replicated to --size addresses and classified with 1, 2, 4, ...
+# workers up to --max-workers (default: CPU count), as forked processes and as threads
+# (which only scale on free-threaded Python). Each run is checked against the
+# single-worker results, so ordering or sharing bugs show up as mismatches.
+#
+# Usage (from the repository root):
+#   python -m benchmarks.BatchBenchmark [--size 200000] [--max-workers 8] [--chunksize 256] [--modes process thread]
+
+####################################################################
+import argparse
+import json
+import os
+import time
+
+from Solution import Solution, gil_enabled
+
+TEST_FILE = "public.json"
+
+
+def worker_counts(max_workers):
+    counts = []
+    n = 1
+    while n < max_workers:
+        counts.append(n)
+        n *= 2
+    counts.append(max_workers)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="process_batch scaling benchmark")
+    parser.add_argument("--size", type=int, default=200_000, help="number of addresses after replication")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunksize", type=int, default=256)
+    parser.add_argument("--modes", nargs="+", choices=["process", "thread"], default=["process", "thread"])
+    args = parser.parse_args()
+
+    with open(TEST_FILE, encoding="utf-8") as f:
+        texts = [item["text"] for item in json.load(f)]
+    addresses = (texts * (args.size // len(texts) + 1))[:args.size]
+
+    start = time.perf_counter()
+    solution = Solution()
+    print(f"Index built in {time.perf_counter() - start:.2f}s, {len(addresses)} addresses, "
+          f"{os.cpu_count()} CPUs, GIL {'enabled' if gil_enabled() else 'disabled'}")
+
+    reference = None
+    base_throughput = None
+    print(f"{'mode':>8}{'workers':>8}{'seconds':>10}{'addr/s':>12}{'speedup':>9}{'mismatches':>12}")
+    for mode in args.modes:
+        for workers in worker_counts(args.max_workers):
+            start = time.perf_counter()
+            results = solution.process_batch(addresses, workers=workers, chunksize=args.chunksize, mode=mode)
+            elapsed = time.perf_counter() - start
+
+            if reference is None:
+                reference = results
+            mismatches = sum(a != b for a, b in zip(reference, results))
+            throughput = len(addresses) / elapsed
+            base_throughput = base_throughput or throughput
+            print(f"{mode:>8}{workers:>8}{elapsed:>10.2f}{throughput:>12.0f}{throughput / base_throughput:>8.2f}x"
+                  f"{mismatches:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+# Latency and throughput benchmark suite
+# For each database (the bundled list files and the full vietnamese-provinces-database)
+# it measures startup (index build, or snapshot load when one matches), then per-call
+# latency on public.json (with accuracy, via RunTests.evaluate) and on synthetic
+# addresses generated from that database at each --sizes. Every scenario reports
+# p50/p90/p99/max/avg latency and throughput.
+#
+# The run fails (exit code 1) when a scenario breaks the README budgets (max <= 0.1s,
+# avg <= 0.01s per request) or, with --baseline, when its avg/p99 latency grows by
+# more than --tolerance or its accuracy drops compared with a stored run.
+#
+# Usage (from the repository root):
+#   python -m benchmarks.Benchmark [--databases bundled full] [--sizes 1000 10000]
+#   python -m benchmarks.Benchmark --save-baseline benchmarks/baseline.json
+#   python -m benchmarks.Benchmark --baseline benchmarks/baseline.json [--tolerance 0.5]
+
+####################################################################
+import argparse
+import json
+import random
+import sys
+import time
+
+from RunTests import evaluate, load_test_data
+from Solution import Solution
+from Utils import remove_accent
+
+DATABASES = {
+    "bundled": None,  # list files in the repository root
+    "full": "vietnamese-provinces-database",
+}
+
+MAX_TIME_BUDGET = 0.1
+AVG_TIME_BUDGET = 0.01
+
+WARD_PREFIXES = ["", "P.", "P ", "Phường ", "X.", "Xã ", "F"]
+DISTRICT_PREFIXES = ["", "Q.", "Q ", "Quận ", "H.", "Huyện ", "TX.", "Thị xã "]
+PROVINCE_PREFIXES = ["", "TP.", "TP ", "Thành phố ", "T.", "Tỉnh "]
+STREETS = ["Nguyễn Trãi", "Lê Lợi", "Trần Hưng Đạo", "Hai Bà Trưng", "Ng-T- Thuật", "Đường số 7"]
+
+
+def read_names(path):
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def add_typo(rng, name):
+    """Drop, repeat or swap one character."""
+    if len(name) < 4:
+        return name
+    i = rng.randrange(1, len(name) - 1)
+    kind = rng.randrange(3)
+    if kind == 0:
+        return name[:i] + name[i + 1:]
+    if kind == 1:
+        return name[:i] + name[i] + name[i:]
+    return name[:i - 1] + name[i] + name[i - 1] + name[i + 1:]
+
+
+def synthetic_addresses(solution, size, seed=0):
+    """
+    size noisy addresses built from solution's own list files: random street number,
+    ward, district and province with random prefixes, missing parts, dropped accents,
+    typos and separators. Names are drawn independently, so this measures speed, not accuracy.
+    """
+    rng = random.Random(seed)
+    provinces = read_names(solution.province_path)
+    districts = read_names(solution.district_path)
+    wards = read_names(solution.ward_path)
+
+    addresses = []
+    for _ in range(size):
+        parts = []
+        if rng.random() < 0.5:
+            parts.append(f"{rng.randint(1, 999)}/{rng.randint(1, 99)} {rng.choice(STREETS)}")
+        for names, prefixes, keep in ((wards, WARD_PREFIXES, 0.8), (districts, DISTRICT_PREFIXES, 0.9),
+                                      (provinces, PROVINCE_PREFIXES, 0.95)):
+            if rng.random() > keep:
+                continue
+            name = rng.choice(names)
+            if rng.random() < 0.3:
+                name = remove_accent(name)
+            if rng.random() < 0.2:
+                name = add_typo(rng, name)
+            if rng.random() < 0.1:
+                name = name.replace(" ", "")
+            parts.append(rng.choice(prefixes) + name)
+        addresses.append(rng.choice([", ", ",", " ", " - "]).join(parts) + rng.choice(["", ".", " "]))
+    return addresses
+
+
+def latency_summary(times, elapsed):
+    """Percentiles of per-call times (seconds) and throughput over the wall time elapsed."""
+    times = sorted(times)
+    if not times:
+        return {"count": 0}
+
+    def percentile(q):
+        return times[min(len(times) - 1, int(q * len(times)))]
+
+    return {
+        "count": len(times),
+        "p50": percentile(0.5),
+        "p90": percentile(0.9),
+        "p99": percentile(0.99),
+        "max": times[-1],
+        "avg": sum(times) / len(times),
+        "throughput": len(times) / max(elapsed, 1e-9),
+    }
+
+
+def time_calls(solution, addresses):
+    times = []
+    start = time.perf_counter()
+    for address in addresses:
+        call_start = time.perf_counter()
+        solution.process(address)
+        times.append(time.perf_counter() - call_start)
+    return latency_summary(times, time.perf_counter() - start)
+
+
+def run_database(name, data_dir, test_data, sizes, use_snapshot=True, seed=0):
+    """Scenario name -> metrics for one database."""
+    scenarios = {}
+    kwargs = {} if use_snapshot else {"snapshot_path": None}
+    start = time.perf_counter()
+    solution = Solution(data_dir=data_dir, **kwargs)
+    scenarios[f"{name}/startup"] = {"startup_sec": time.perf_counter() - start}
+
+    start = time.perf_counter()
+    _, correct, timer = evaluate(solution, test_data)
+    metrics = latency_summary([t / 1_000_000_000 for t in timer], time.perf_counter() - start)
+    metrics["accuracy"] = correct / (3 * len(test_data))
+    scenarios[f"{name}/public"] = metrics
+
+    for size in sizes:
+        scenarios[f"{name}/synthetic-{size}"] = time_calls(solution, synthetic_addresses(solution, size, seed))
+    return scenarios
+
+
+def check_budgets(scenarios):
+    failures = []
+    for scenario, metrics in scenarios.items():
+        if "max" not in metrics:
+            continue
+        if metrics["max"] > MAX_TIME_BUDGET:
+            failures.append(f"{scenario}: max {metrics['max']:.4f}s > {MAX_TIME_BUDGET}s budget")
+        if metrics["avg"] > AVG_TIME_BUDGET:
+            failures.append(f"{scenario}: avg {metrics['avg']:.5f}s > {AVG_TIME_BUDGET}s budget")
+    return failures
+
+
+def check_baseline(scenarios, baseline, tolerance):
+    failures = []
+    for scenario, metrics in scenarios.items():
+        stored = baseline.get(scenario)
+        if not stored:
+            continue
+        for key in ("avg", "p99", "startup_sec"):
+            if key in metrics and key in stored and metrics[key] > stored[key] * (1 + tolerance):
+                failures.append(f"{scenario}: {key} {metrics[key]:.5f}s > baseline {stored[key]:.5f}s "
+                                f"+{tolerance:.0%}")
+        if "accuracy" in metrics and metrics["accuracy"] < stored.get("accuracy", 0):
+            failures.append(f"{scenario}: accuracy {metrics['accuracy']:.4f} < baseline {stored['accuracy']:.4f}")
+    return failures
+
+
+def print_report(scenarios):
+    print(f"{'scenario':<28}{'count':>8}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}"
+          f"{'avg ms':>9}{'req/s':>9}{'acc':>8}")
+    for scenario, metrics in scenarios.items():
+        if "startup_sec" in metrics:
+            print(f"{scenario:<28}startup {metrics['startup_sec']:.3f}s")
+            continue
+        accuracy = f"{metrics['accuracy']:.4f}" if "accuracy" in metrics else ""
+        print(f"{scenario:<28}{metrics['count']:>8}" +
+              "".join(f"{metrics[key] * 1000:>9.3f}" for key in ("p50", "p90", "p99", "max", "avg")) +
+              f"{metrics['throughput']:>9.0f}{accuracy:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency/throughput benchmark with budget and baseline checks")
+    parser.add_argument("--databases", nargs="+", choices=list(DATABASES), default=list(DATABASES))
+    parser.add_argument("--sizes", nargs="*", type=int, default=[1000, 10000], help="synthetic input sizes")
+    parser.add_argument("--test-file", default="public.json")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-snapshot", action="store_true", help="always build the index from the list files")
+    parser.add_argument("--baseline", help="fail on regressions against this stored run")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed relative slowdown vs the baseline")
+    parser.add_argument("--save-baseline", help="write this run's metrics to a JSON file")
+    parser.add_argument("--no-budgets", action="store_true", help="do not enforce the README time budgets")
+    args = parser.parse_args()
+
+    test_data = load_test_data(args.test_file)
+    scenarios = {}
+    for name in args.databases:
+        scenarios.update(run_database(name, DATABASES[name], test_data, args.sizes,
+                                      use_snapshot=not args.no_snapshot, seed=args.seed))
+    print_report(scenarios)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(scenarios, f, indent=2)
+
+    failures = [] if args.no_budgets else check_budgets(scenarios)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            failures += check_baseline(scenarios, json.load(f), args.tolerance)
+    for failure in failures:
+        print(f"FAIL {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
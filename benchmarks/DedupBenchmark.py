@@ -0,0 +1,71 @@
+# Throughput of Solution.process_deduplicated against calling Solution.process in a loop
+# Two workloads per database: public.json repeated --repeat times (the same addresses
+# over and over, like a batch of records from a few sources) and --size synthetic
+# addresses (benchmarks.Benchmark.synthetic_addresses, nearly all distinct, so only
+# their segments repeat). Each is classified by a plain process loop, by a loop over a
+# Solution with result and segment LRU caches, and by process_deduplicated, which
+# shares autocorrect results between the addresses of the batch; the outputs of all
+# three are checked against each other.
+#
+# Usage (from the repository root):
+#   python -m benchmarks.DedupBenchmark [--databases bundled full] [--repeat 10] [--size 5000]
+
+####################################################################
+import argparse
+import sys
+import time
+
+from RunTests import load_test_data
+from Solution import Solution
+from benchmarks.Benchmark import DATABASES, synthetic_addresses
+
+CACHE_SIZE = 100_000
+
+
+def timed(run, addresses):
+    start = time.perf_counter()
+    outputs = run(addresses)
+    return outputs, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch deduplication vs a process loop: throughput")
+    parser.add_argument("--databases", nargs="+", choices=list(DATABASES), default=list(DATABASES))
+    parser.add_argument("--test-file", default="public.json")
+    parser.add_argument("--repeat", type=int, default=10, help="copies of the test file in the first workload")
+    parser.add_argument("--size", type=int, default=5000, help="synthetic addresses in the second workload")
+    args = parser.parse_args()
+
+    public = [item["text"] for item in load_test_data(args.test_file)]
+    failed = False
+    for name in args.databases:
+        plain = Solution(data_dir=DATABASES[name])
+        cached = Solution(data_dir=DATABASES[name], cache_size=CACHE_SIZE, segment_cache_size=CACHE_SIZE)
+        workloads = {f"{args.test_file} x{args.repeat}": public * args.repeat,
+                     f"synthetic {args.size}": synthetic_addresses(plain, args.size)}
+        runs = {
+            "process loop": lambda addresses: [plain.process(s) for s in addresses],
+            "loop + LRU caches": lambda addresses: [cached.process(s) for s in addresses],
+            "deduplicated": plain.process_deduplicated,
+        }
+
+        print(f"{name}:")
+        print(f"  {'workload':<24}{'distinct':>10}{'run':>20}{'seconds':>10}{'addr/s':>10}{'speed-up':>10}")
+        for workload, addresses in workloads.items():
+            cached.result_cache.clear()
+            cached.segment_cache.clear()
+            baseline = None
+            for label, run in runs.items():
+                outputs, seconds = timed(run, addresses)
+                if baseline is None:
+                    baseline, base_seconds = outputs, seconds
+                elif outputs != baseline:
+                    failed = True
+                    print(f"  {label}: {sum(a != b for a, b in zip(outputs, baseline))} results differ")
+                print(f"  {workload:<24}{len(set(addresses)):>10}{label:>20}{seconds:>10.3f}"
+                      f"{len(addresses) / seconds:>10.0f}{base_seconds / seconds:>9.2f}x")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
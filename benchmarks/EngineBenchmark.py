@@ -0,0 +1,58 @@
+# Cascade vs lattice engine (Solution(engine=...))
+# For each database, classifies public.json with both engines and reports accuracy per
+# field and latency percentiles, then times both on synthetic addresses
+# (benchmarks.Benchmark.synthetic_addresses) and counts how often they disagree.
+#
+# Usage (from the repository root):
+#   python -m benchmarks.EngineBenchmark [--databases bundled full] [--size 5000]
+
+####################################################################
+import argparse
+import time
+
+from RunTests import COLUMNS, evaluate, load_test_data
+from Solution import Solution
+from benchmarks.Benchmark import DATABASES, latency_summary, synthetic_addresses
+
+ENGINES = ["cascade", "lattice"]
+FIELD_COLUMNS = {field: COLUMNS.index(f"{field}_correct") for field in ("province", "district", "ward")}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the cascade and lattice engines")
+    parser.add_argument("--databases", nargs="+", choices=list(DATABASES), default=list(DATABASES))
+    parser.add_argument("--test-file", default="public.json")
+    parser.add_argument("--size", type=int, default=5000, help="synthetic addresses")
+    args = parser.parse_args()
+
+    data = load_test_data(args.test_file)
+    print(f"{'database':<10}{'engine':<9}{'startup s':>10}{'province':>10}{'district':>10}{'ward':>8}{'total':>8}"
+          f"{'p50 ms':>9}{'p99 ms':>9}{'avg ms':>9}{'synth req/s':>13}")
+    for name in args.databases:
+        outputs = {}
+        for engine in ENGINES:
+            start = time.perf_counter()
+            solution = Solution(data_dir=DATABASES[name], engine=engine)
+            startup = time.perf_counter() - start
+
+            start = time.perf_counter()
+            rows, correct, timer = evaluate(solution, data)
+            metrics = latency_summary([t / 1_000_000_000 for t in timer], time.perf_counter() - start)
+            fields = {field: sum(row[column] for row in rows) / len(data) for field, column in FIELD_COLUMNS.items()}
+
+            addresses = synthetic_addresses(solution, args.size)
+            start = time.perf_counter()
+            outputs[engine] = [solution.process(address) for address in addresses]
+            throughput = len(addresses) / (time.perf_counter() - start)
+
+            print(f"{name:<10}{engine:<9}{startup:>10.2f}" +
+                  "".join(f"{fields[field]:>{width}.4f}" for field, width in (("province", 10), ("district", 10), ("ward", 8))) +
+                  f"{correct / (3 * len(data)):>8.4f}" +
+                  "".join(f"{metrics[key] * 1000:>9.3f}" for key in ("p50", "p99", "avg")) +
+                  f"{throughput:>13.0f}")
+        disagreements = sum(a != b for a, b in zip(*outputs.values()))
+        print(f"{name:<10}engines disagree on {disagreements}/{args.size} synthetic addresses")
+
+
+if __name__ == "__main__":
+    main()
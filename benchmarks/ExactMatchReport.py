@@ -0,0 +1,73 @@
+# Hit rate of the exact-match fast path (Searcher.search_exact, Solution(exact_match=...))
+# For each database, counts the public.json addresses the fast path resolves on its own
+# (full hits: no trie or fuzzy search), those where it finds the last parts and leaves
+# the rest to the cascade (partial hits) and the misses, with the accuracy of each group.
+# It then classifies everything with and without the fast path, reporting how often the
+# answers differ and the latency of both.
+#
+# Usage (from the repository root):
+#   python -m benchmarks.ExactMatchReport [--databases bundled full] [--test-file public.json]
+
+####################################################################
+import argparse
+import time
+
+from RunTests import load_test_data
+from Searcher import search_exact
+from Solution import Solution
+from Utils import normalize_text_but_keep_accent, segment_text
+from benchmarks.Benchmark import DATABASES, latency_summary
+
+FIELDS = ("province", "district", "ward")
+GROUPS = ["full", "partial", "miss"]
+
+
+def classify(solution, addresses):
+    start = time.perf_counter()
+    outputs, timer = [], []
+    for address in addresses:
+        begin = time.perf_counter()
+        outputs.append(solution.process(address))
+        timer.append(time.perf_counter() - begin)
+    return outputs, latency_summary(timer, time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exact-match fast path: hit rate and speed-up")
+    parser.add_argument("--databases", nargs="+", choices=list(DATABASES), default=list(DATABASES))
+    parser.add_argument("--test-file", default="public.json")
+    args = parser.parse_args()
+
+    data = load_test_data(args.test_file)
+    addresses = [item["text"] for item in data]
+    for name in args.databases:
+        fast = Solution(data_dir=DATABASES[name])
+        slow = Solution(data_dir=DATABASES[name], exact_match=False)
+        index = fast.index
+
+        groups = []
+        for address in addresses:
+            input_text = normalize_text_but_keep_accent(",".join(segment_text(address)))
+            results = {field: "" for field in FIELDS}
+            results, _, complete = search_exact(index.exact, index.tries, input_text, results, index.regions)
+            groups.append("full" if complete else "partial" if any(results.values()) else "miss")
+
+        outputs, fast_latency = classify(fast, addresses)
+        baseline, slow_latency = classify(slow, addresses)
+
+        print(f"{name}: {len(addresses)} addresses, {len(index.exact)} indexed variants")
+        print(f"  {'group':<9}{'addresses':>10}{'share':>8}{'accuracy':>10}")
+        for group in GROUPS:
+            members = [i for i, g in enumerate(groups) if g == group]
+            correct = sum(outputs[i][field] == data[i]["result"][field] for i in members for field in FIELDS)
+            accuracy = correct / (3 * len(members)) if members else 0.0
+            print(f"  {group:<9}{len(members):>10}{len(members) / len(addresses):>8.1%}{accuracy:>10.4f}")
+        differ = sum(a != b for a, b in zip(outputs, baseline))
+        print(f"  answers differing from exact_match=False: {differ}")
+        for label, latency in (("fast path", fast_latency), ("without", slow_latency)):
+            print(f"  {label:<10} p50 {latency['p50'] * 1000:.3f} ms  p99 {latency['p99'] * 1000:.3f} ms"
+                  f"  avg {latency['avg'] * 1000:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+# Worst-case latency fuzzer for Solution.process
+# Generators produce families of hostile inputs (long texts, comma floods, repeated
+# prefixes such as "TP" that segment_text splits on, runs of valid trie prefixes,
+# near-miss names that reach the autocorrect fallback, numbers) up to --max-length
+# characters. A hill climb then mutates the slowest inputs found so far (splicing,
+# duplicating segments, inserting commas, prefixes and typos) to make them slower still.
+# Every input is timed as the best of --repeats calls.
+#
+# For the worst case of each family it reports the time without and with
+# Solution(guard=True), also with the input repeated --scale times, which only the
+# guard keeps flat. --record stores them as regression fixtures; --check replays a
+# fixture file and fails (exit code 1) if a guarded call takes longer than the 0.1 s
+# ceiling (benchmarks.Benchmark.MAX_TIME_BUDGET).
+#
+# Usage (from the repository root):
+#   python -m benchmarks.LatencyFuzzer [--databases full] [--iterations 2000] [--record benchmarks/worst_cases.json]
+#   python -m benchmarks.LatencyFuzzer --check benchmarks/worst_cases.json
+
+####################################################################
+import argparse
+import json
+import random
+import sys
+import time
+
+from RunTests import load_test_data
+from Solution import GUARD_MAX_INPUT_CHARS, Solution
+from Utils import ALL_PREFIXES, SAFE_CASES, remove_accent
+from benchmarks.Benchmark import DATABASES, MAX_TIME_BUDGET, add_typo, read_names
+
+DEFAULT_FIXTURES = "benchmarks/worst_cases.json"
+PREFIX_TOKENS = sorted({case.strip() for case in ALL_PREFIXES + SAFE_CASES if case.strip()})
+SEPARATORS = [",", " ", ", ", ".", "-", ""]
+
+
+def time_call(solution, text, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        solution.process(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def fill(rng, pieces, max_length, separators=SEPARATORS):
+    """Join draws from pieces() with random separators until max_length."""
+    parts, length = [], 0
+    while length < max_length:
+        piece = pieces() + rng.choice(separators)
+        parts.append(piece)
+        length += len(piece)
+    return "".join(parts)[:max_length]
+
+
+def long_texts(rng, names, addresses, max_length):
+    while True:
+        yield fill(rng, lambda: rng.choice(addresses), max_length, [" ", ", "])
+
+
+def comma_floods(rng, names, addresses, max_length):
+    while True:
+        yield fill(rng, lambda: rng.choice(names)[:rng.randint(1, 6)], max_length, [",", ", ", ",,"])
+
+
+def repeated_prefixes(rng, names, addresses, max_length):
+    while True:
+        token = rng.choice(PREFIX_TOKENS)
+        yield fill(rng, lambda: token if rng.random() < 0.8 else rng.choice(PREFIX_TOKENS), max_length)
+
+
+def trie_prefixes(rng, names, addresses, max_length):
+    # Every piece starts a gazetteer name and stops before its end
+    while True:
+        yield fill(rng, lambda: (lambda name: name[:rng.randint(1, max(1, len(name) - 1))])(rng.choice(names)),
+                   max_length, ["", "", " ", ","])
+
+
+def near_misses(rng, names, addresses, max_length):
+    def piece():
+        name = rng.choice(names)
+        for _ in range(rng.randint(1, 3)):
+            name = add_typo(rng, name)
+        return remove_accent(name) if rng.random() < 0.5 else name
+    while True:
+        yield fill(rng, piece, max_length, [", ", ","])
+
+
+def numbers(rng, names, addresses, max_length):
+    while True:
+        yield fill(rng, lambda: rng.choice(["", "P", "Q", "F", "P.", "Q.", "Phường ", "Quận "]) + str(rng.randint(0, 99)),
+                   max_length, [",", " ", ", "])
+
+
+FAMILIES = {
+    "long_text": long_texts,
+    "comma_flood": comma_floods,
+    "repeated_prefix": repeated_prefixes,
+    "trie_prefixes": trie_prefixes,
+    "near_miss": near_misses,
+    "numbers": numbers,
+}
+
+
+def mutate(rng, text, pool, names, max_length):
+    kind = rng.randrange(5)
+    i = rng.randrange(len(text) + 1)
+    if kind == 0:  # splice in a piece of another slow input
+        other = rng.choice(pool)[2]
+        j = rng.randrange(len(other) + 1)
+        text = text[:i] + other[j:j + rng.randint(1, 40)] + text[i:]
+    elif kind == 1:  # duplicate a segment
+        segments = text.split(",")
+        k = rng.randrange(len(segments))
+        segments.insert(k, segments[k])
+        text = ",".join(segments)
+    elif kind == 2:
+        text = text[:i] + "," + text[i:]
+    elif kind == 3:
+        text = text[:i] + rng.choice(PREFIX_TOKENS) + rng.choice(SEPARATORS) + text[i:]
+    else:
+        text = text[:i] + add_typo(rng, rng.choice(names)) + text[i:]
+    return text[:max_length]
+
+
+def fuzz(solution, names, addresses, args, rng):
+    """{family: (seconds, text)} of the slowest input found per family."""
+    generators = {family: make(rng, names, addresses, args.max_length) for family, make in FAMILIES.items()}
+    pool = []  # (seconds, family, text), slowest first
+    worst = {}
+    for _ in range(args.iterations):
+        if pool and rng.random() < 0.6:
+            _, family, parent = rng.choice(pool[:args.keep])
+            text = mutate(rng, parent, pool, names, args.max_length)
+        else:
+            family = rng.choice(list(generators))
+            text = next(generators[family])
+        seconds = time_call(solution, text, args.repeats)
+        pool.append((seconds, family, text))
+        pool.sort(key=lambda entry: -entry[0])
+        del pool[args.keep * 4:]
+        if seconds > worst.get(family, (0.0, ""))[0]:
+            worst[family] = (seconds, text)
+    return worst
+
+
+def replay(cases, solutions, scale, repeats):
+    """[(family, length, {label: seconds})] for each case as is and repeated scale times."""
+    rows = []
+    for family, text in cases:
+        for label, sample in (("", text), (f" x{scale}", ", ".join([text] * scale))):
+            rows.append((family + label, len(sample),
+                         {name: time_call(solution, sample, repeats) for name, solution in solutions.items()}))
+    return rows
+
+
+def print_rows(rows, names):
+    print(f"  {'case':<24}{'chars':>8}" + "".join(f"{name + ' ms':>14}" for name in names))
+    for family, length, seconds in rows:
+        print(f"  {family:<24}{length:>8}" + "".join(f"{seconds[name] * 1000:>14.2f}" for name in names))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search for the inputs that make Solution.process slowest")
+    parser.add_argument("--databases", nargs="+", choices=list(DATABASES),
+                        help="default: full when fuzzing, those of the fixtures with --check")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--max-length", type=int, default=GUARD_MAX_INPUT_CHARS, help="characters per fuzzed input")
+    parser.add_argument("--repeats", type=int, default=3, help="calls per input, the fastest counts")
+    parser.add_argument("--keep", type=int, default=20, help="slowest inputs mutated further")
+    parser.add_argument("--scale", type=int, default=50, help="repetitions of the worst cases in the replay")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--record", nargs="?", const=DEFAULT_FIXTURES, help="write the worst cases to this file")
+    parser.add_argument("--check", help="replay a fixture file instead of fuzzing")
+    args = parser.parse_args()
+
+    if args.check:
+        with open(args.check, encoding="utf-8") as f:
+            fixtures = json.load(f)
+        failed = False
+        for name in args.databases or sorted({case["database"] for case in fixtures}):
+            solutions = {"guard": Solution(data_dir=DATABASES[name], guard=True)}
+            rows = replay([(case["family"], case["text"]) for case in fixtures if case["database"] == name],
+                          solutions, args.scale, args.repeats)
+            print(f"{name}: {len(rows)} fixture replays, ceiling {MAX_TIME_BUDGET * 1000:.0f} ms")
+            print_rows(rows, solutions)
+            slow = [row for row in rows if row[2]["guard"] > MAX_TIME_BUDGET]
+            failed |= bool(slow)
+            print(f"  {'FAIL' if slow else 'ok'}: slowest {max(row[2]['guard'] for row in rows) * 1000:.2f} ms"
+                  if rows else "  no fixtures")
+        sys.exit(1 if failed else 0)
+
+    rng = random.Random(args.seed)
+    addresses = [item["text"] for item in load_test_data()]
+    fixtures = []
+    for name in args.databases or ["full"]:
+        solutions = {"plain": Solution(data_dir=DATABASES[name]), "guard": Solution(data_dir=DATABASES[name], guard=True)}
+        names = sorted({n for category in ("province", "district", "ward")
+                        for n in read_names(solutions["plain"].filenames[category])})
+        start = time.perf_counter()
+        worst = fuzz(solutions["plain"], names, addresses, args, rng)
+        print(f"{name}: {args.iterations} inputs of up to {args.max_length} characters fuzzed in "
+              f"{time.perf_counter() - start:.1f} s; worst case per family:")
+        cases = sorted(worst.items(), key=lambda item: -item[1][0])
+        print_rows(replay([(family, text) for family, (_, text) in cases], solutions, args.scale, args.repeats),
+                   solutions)
+        fixtures += [{"database": name, "family": family, "length": len(text), "seconds": round(seconds, 6),
+                      "text": text} for family, (seconds, text) in cases]
+
+    if args.record:
+        with open(args.record, "w", encoding="utf-8") as f:
+            json.dump(fixtures, f, ensure_ascii=False, indent=1)
+        print(f"Recorded {len(fixtures)} worst cases in {args.record}")
+
+
+if __name__ == "__main__":
+    main()
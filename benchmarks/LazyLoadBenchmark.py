@@ -0,0 +1,105 @@
+# Startup time and resident memory: eager vs lazy index loading (Solution(lazy=True))
+# Each run happens in a fresh process, which reports the resident set size (RSS) and
+# the time after importing, after building the Solution, after its first address and
+# after all addresses, plus how many of the lazy tries (country-wide district/ward and
+# hierarchy regions) were built by then.
+#
+# --provinces N only sends addresses of N provinces (by their labels in public.json),
+# like a worker that only serves a few regions. Province shards need a hierarchy file:
+# pass one with --hierarchy, or --hierarchy labels to derive one from public.json.
+#
+# Usage (from the repository root):
+#   python -m benchmarks.LazyLoadBenchmark [--databases bundled full] [--provinces 3] [--hierarchy labels]
+
+####################################################################
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+
+from benchmarks.Benchmark import DATABASES
+
+TEST_FILE = "public.json"
+
+
+def resident_bytes() -> int:
+    """Current RSS on Linux, peak RSS elsewhere."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def lazy_tries(solution):
+    from IndexAnalyzer import LazyTrie
+    tries = list(solution.tries.values())
+    for by_parent in (solution.regions or {}).values():
+        tries += list(by_parent.values())
+    tries = [trie for trie in tries if isinstance(trie, LazyTrie)]
+    return sum(trie.loaded for trie in tries), len(tries)
+
+
+def measure(data_dir, lazy, hierarchy, texts):
+    """Runs in a fresh process: [(stage, seconds since start, RSS, built/lazy tries)]."""
+    start = time.perf_counter()
+    from Solution import Solution
+    rows = [("import", time.perf_counter() - start, resident_bytes(), None)]
+
+    solution = Solution(data_dir=data_dir, lazy=lazy, hierarchy_path=hierarchy)
+    rows.append(("startup", time.perf_counter() - start, resident_bytes(), lazy_tries(solution)))
+    solution.process(texts[0])
+    rows.append(("first address", time.perf_counter() - start, resident_bytes(), lazy_tries(solution)))
+    for text in texts[1:]:
+        solution.process(text)
+    rows.append((f"{len(texts)} addresses", time.perf_counter() - start, resident_bytes(), lazy_tries(solution)))
+    return rows
+
+
+def write_label_hierarchy(data) -> str:
+    rows = sorted({(item["result"]["province"], item["result"]["district"], item["result"]["ward"])
+                   for item in data if item["result"]["province"] and item["result"]["district"]})
+    with tempfile.NamedTemporaryFile("w", encoding="utf-8", suffix=".tsv", delete=False) as file:
+        file.write("".join("\t".join(row) + "\n" for row in rows))
+    return file.name
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Eager vs lazy index loading: startup time and memory")
+    parser.add_argument("--databases", nargs="+", choices=list(DATABASES), default=list(DATABASES))
+    parser.add_argument("--provinces", type=int, default=3, help="provinces the addresses come from (0: all)")
+    parser.add_argument("--hierarchy", help="hierarchy file for province shards, or 'labels' to derive it")
+    args = parser.parse_args()
+
+    with open(TEST_FILE, encoding="utf-8") as f:
+        data = json.load(f)
+    if args.provinces:
+        provinces = sorted({item["result"]["province"] for item in data if item["result"]["province"]})
+        keep = set(provinces[:args.provinces])
+        data = [item for item in data if item["result"]["province"] in keep]
+    texts = [item["text"] for item in data]
+    hierarchy = write_label_hierarchy(data) if args.hierarchy == "labels" else args.hierarchy
+
+    context = multiprocessing.get_context("spawn")
+    try:
+        print(f"{len(texts)} addresses, hierarchy: {args.hierarchy or 'none'}")
+        print(f"{'database':<10}{'mode':<7}{'stage':<16}{'seconds':>9}{'RSS MB':>9}{'built tries':>13}")
+        for name in args.databases:
+            for lazy in (False, True):
+                with context.Pool(1) as pool:
+                    rows = pool.apply(measure, (DATABASES[name], lazy, hierarchy, texts))
+                base_rss = rows[0][2]
+                for stage, seconds, rss, built in rows[1:]:
+                    built = f"{built[0]}/{built[1]}" if built and built[1] else "-"
+                    print(f"{name:<10}{'lazy' if lazy else 'eager':<7}{stage:<16}{seconds:>9.3f}"
+                          f"{(rss - base_rss) / 1e6:>9.1f}{built:>13}")
+    finally:
+        if args.hierarchy == "labels":
+            os.unlink(hierarchy)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# Load generator for Server.py
+# Opens --concurrency connections to a running server (or starts one with --spawn),
+# each sending public.json addresses one at a time and waiting for the answer (closed
+# loop), and reports client-side latency percentiles and throughput, followed by the
+# server's own metrics.
+#
+# Usage (from the repository root):
+#   python -m benchmarks.LoadGenerator --spawn [--concurrency 64] [--requests 20000] [--workers 2]
+#   python -m benchmarks.LoadGenerator --port 8765 ...
+
+####################################################################
+import argparse
+import asyncio
+import itertools
+import json
+import subprocess
+import sys
+import time
+
+from Server import DEFAULT_HOST, DEFAULT_PORT
+
+TEST_FILE = "public.json"
+SHUTDOWN_TIMEOUT = 10  # seconds a spawned server gets to shut down before it is killed
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+async def client(host, port, unix_path, texts, counter, total, latencies):
+    if unix_path:
+        reader, writer = await asyncio.open_unix_connection(unix_path)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    while (i := next(counter)) < total:
+        request = json.dumps({"id": i, "text": texts[i % len(texts)]}, ensure_ascii=False)
+        start = time.perf_counter()
+        writer.write(request.encode() + b"\n")
+        await writer.drain()
+        response = json.loads(await reader.readline())
+        latencies.append(time.perf_counter() - start)
+        if "error" in response:
+            print(f"error: {response['error']}", file=sys.stderr)
+    writer.close()
+
+
+async def fetch_metrics(host, port, unix_path):
+    if unix_path:
+        reader, writer = await asyncio.open_unix_connection(unix_path)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    writer.write(b'{"command": "metrics"}\n')
+    await writer.drain()
+    response = json.loads(await reader.readline())
+    writer.close()
+    return response["metrics"]
+
+
+async def run(args, texts):
+    latencies = []
+    counter = itertools.count()
+    start = time.perf_counter()
+    await asyncio.gather(*(client(args.host, args.port, args.unix, texts, counter, args.requests, latencies)
+                           for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"{len(latencies)} requests, concurrency {args.concurrency}, {elapsed:.2f}s, "
+          f"{len(latencies) / elapsed:.0f} req/s")
+    print("latency ms: " + ", ".join(f"p{int(q * 100)}={percentile(latencies, q) * 1000:.2f}"
+                                     for q in (0.5, 0.9, 0.99)) + f", max={latencies[-1] * 1000:.2f}")
+
+    metrics = await fetch_metrics(args.host, args.port, args.unix)
+    print(f"server: avg batch {metrics['avg_batch_size']:.1f}, max queue depth {metrics['max_queue_depth']}, "
+          f"p50 {metrics['latency_sec']['p50'] * 1000:g}ms, p99 {metrics['latency_sec']['p99'] * 1000:g}ms (bucket bounds)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load generator for Server.py")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", help="connect to this Unix socket instead of TCP")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--spawn", action="store_true", help="start a server for the duration of the run")
+    parser.add_argument("--workers", type=int, default=0, help="server workers, with --spawn")
+    parser.add_argument("--window-ms", type=float, default=2.0, help="server batching window, with --spawn")
+    args = parser.parse_args()
+
+    with open(TEST_FILE, encoding="utf-8") as f:
+        texts = [item["text"] for item in json.load(f)]
+
+    server = None
+    if args.spawn:
+        command = [sys.executable, "Server.py", "--workers", str(args.workers), "--window-ms", str(args.window_ms)]
+        command += ["--unix", args.unix] if args.unix else ["--host", args.host, "--port", str(args.port)]
+        server = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+        for line in server.stdout:  # wait until it listens
+            if line.startswith("Serving on"):
+                break
+    try:
+        asyncio.run(run(args, texts))
+    finally:
+        if server:
+            # SIGTERM: the server closes its socket and shuts its workers down
+            server.terminate()
+            try:
+                server.wait(timeout=SHUTDOWN_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                server.kill()
+                server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# Memory report: dict-per-node Trie vs array-backed CompactTrie
+# For each gazetteer, builds the tries with load_databases and measures (tracemalloc)
+# how much memory the built index holds, then converts them to CompactTrie, drops
+# the originals and measures again. The per-category table only counts the node
+# structures themselves (nodes, children dicts and Aho-Corasick outputs vs the flat
+# arrays); the strings, all_words and original_names are shared by both forms.
+#
+# Usage (from the repository root):
+#   python -m benchmarks.MemoryReport
+
+####################################################################
+import gc
+import sys
+import tracemalloc
+from array import array
+
+from IndexAnalyzer import CompactTrie, Trie, load_databases
+
+DATABASES = {
+    "bundled": {
+        "province": "list_province.txt",
+        "district": "list_district.txt",
+        "ward": "list_ward.txt",
+    },
+    "full": {
+        "province": "vietnamese-provinces-database/list_province.txt",
+        "district": "vietnamese-provinces-database/list_district.txt",
+        "ward": "vietnamese-provinces-database/list_ward.txt",
+    },
+}
+
+
+def trie_structure_size(trie: Trie):
+    """(node count, bytes) of the TrieNode graph."""
+    nodes, size = 0, 0
+    seen_outputs = set()
+    stack = [trie.root]
+    while stack:
+        node = stack.pop()
+        nodes += 1
+        size += sys.getsizeof(node) + sys.getsizeof(node.__dict__) + sys.getsizeof(node.children)
+        # Nodes without their own word share their failure node's output list
+        if id(node.outputs) not in seen_outputs:
+            seen_outputs.add(id(node.outputs))
+            size += sys.getsizeof(node.outputs)
+        stack.extend(node.children.values())
+    return nodes, size
+
+
+def compact_structure_size(trie: CompactTrie):
+    """(node count, bytes) of the flat arrays, the label string and the word list."""
+    size = sys.getsizeof(trie.labels) + sys.getsizeof(trie.words)
+    for value in vars(trie).values():
+        if isinstance(value, (array, memoryview)):
+            size += sys.getsizeof(value) + (value.nbytes if isinstance(value, memoryview) else 0)
+    return len(trie.terminal), size
+
+
+def traced_bytes():
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0]
+
+
+def report(name, filenames):
+    tracemalloc.start()
+    baseline = traced_bytes()
+
+    tries = {}
+    load_databases(filenames, tries)
+    trie_total = traced_bytes() - baseline
+    trie_sizes = {category: trie_structure_size(trie) for category, trie in tries.items()}
+
+    compact = {category: CompactTrie(trie) for category, trie in tries.items()}
+    del tries
+    compact_total = traced_bytes() - baseline
+    compact_sizes = {category: compact_structure_size(trie) for category, trie in compact.items()}
+    tracemalloc.stop()
+
+    print(f"\n== {name} gazetteer ==")
+    print(f"{'category':<10}{'nodes':>9}{'Trie (KB)':>12}{'Compact (KB)':>14}{'ratio':>8}")
+    for category in compact:
+        nodes, trie_size = trie_sizes[category]
+        _, compact_size = compact_sizes[category]
+        print(f"{category:<10}{nodes:>9}{trie_size / 1024:>12.1f}{compact_size / 1024:>14.1f}"
+              f"{trie_size / compact_size:>7.1f}x")
+    print(f"Whole index retained (tracemalloc): Trie {trie_total / 1e6:.2f} MB, "
+          f"CompactTrie {compact_total / 1e6:.2f} MB")
+
+
+def main():
+    for name, filenames in DATABASES.items():
+        report(name, filenames)
+
+
+if __name__ == "__main__":
+    main()
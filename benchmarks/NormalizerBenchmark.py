@@ -0,0 +1,104 @@
+# Microbenchmark for the text normalization functions in Utils
+# Compares the precompiled pipeline with the previous implementation (one re.sub per
+# prefix, per-character combining filter, one str.replace per wrong accent), checks
+# that both give the same output and prints the per-call cost of each.
+#
+# Usage (from the repository root):
+#   python -m benchmarks.NormalizerBenchmark [--repeat 5]
+
+####################################################################
+import argparse
+import json
+import re
+import time
+import unicodedata
+
+import Utils
+from Utils import SAFE_CASES, ALL_PREFIXES, wrong_accents
+
+CORPUS_FILES = [
+    "list_province.txt", "list_district.txt", "list_ward.txt",
+    "vietnamese-provinces-database/list_province.txt",
+    "vietnamese-provinces-database/list_district.txt",
+    "vietnamese-provinces-database/list_ward.txt",
+]
+TEST_FILE = "public.json"
+
+
+# Previous implementation, kept here as the reference for output and timing
+def legacy_common_normalize(text: str) -> str:
+    text = text.lower()
+    for case in SAFE_CASES:
+        text = re.sub(re.escape(case), ',', text, flags=re.IGNORECASE)
+    text = re.sub(r"\s{2,}", ",", text)
+    text = text.replace(" ", "")
+    return text
+
+def legacy_normalize_text_and_remove_accent(text: str) -> str:
+    text = legacy_common_normalize(text)
+    text = unicodedata.normalize("NFKD", text)
+    text = text.replace("đ", "d")
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return text
+
+def legacy_normalize_text_but_keep_accent(text: str) -> str:
+    text = legacy_common_normalize(text)
+    text = unicodedata.normalize("NFKC", text)
+    for wrong, correct in wrong_accents.items():
+        text = text.replace(wrong, correct)
+    return text
+
+def legacy_segment_text(s, safe=True):
+    text = s[:]
+    prefixes = SAFE_CASES if safe else ALL_PREFIXES
+    for p in prefixes:
+        text = re.sub(re.escape(p), ',', text, flags=re.IGNORECASE)
+    text = re.sub(r'[.]', ' ', text)
+    return [seg.strip() for seg in text.split(',') if seg.strip()]
+
+
+CASES = [
+    ("normalize_text_but_keep_accent", legacy_normalize_text_but_keep_accent, Utils.normalize_text_but_keep_accent),
+    ("normalize_text_and_remove_accent", legacy_normalize_text_and_remove_accent, Utils.normalize_text_and_remove_accent),
+    ("segment_text(safe=True)", lambda s: legacy_segment_text(s, True), lambda s: Utils.segment_text(s, True)),
+    ("segment_text(safe=False)", lambda s: legacy_segment_text(s, False), lambda s: Utils.segment_text(s, False)),
+]
+
+
+def load_corpus():
+    corpus = []
+    for filename in CORPUS_FILES:
+        with open(filename, encoding="utf-8") as f:
+            corpus.extend(line.strip() for line in f if line.strip())
+    with open(TEST_FILE, encoding="utf-8") as f:
+        corpus.extend(item["text"] for item in json.load(f))
+    return corpus
+
+
+def time_per_call(func, corpus, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in corpus:
+            func(text)
+        best = min(best, time.perf_counter() - start)
+    return best / len(corpus)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Normalization microbenchmark")
+    parser.add_argument("--repeat", type=int, default=5, help="timing rounds, the best one is reported")
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    print(f"Corpus: {len(corpus)} strings")
+    print(f"{'function':<34}{'before (us)':>12}{'after (us)':>12}{'speedup':>9}{'mismatches':>12}")
+    for name, legacy, current in CASES:
+        mismatches = sum(legacy(text) != current(text) for text in corpus)
+        before = time_per_call(legacy, corpus, args.repeat) * 1e6
+        after = time_per_call(current, corpus, args.repeat) * 1e6
+        print(f"{name:<34}{before:>12.2f}{after:>12.2f}{before / after:>8.1f}x{mismatches:>12}")
+
+
+if __name__ == "__main__":
+    main()
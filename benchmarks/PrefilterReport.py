@@ -0,0 +1,55 @@
+# Effect of the autocorrect noise prefilter (Autocorrect.cannot_match)
+# Classifies public.json with the prefilter on and off, with instrumentation, and
+# reports how many autocorrect lookups it answered without edit-distance work, the
+# editdistance calls and cosine scorings saved, and the time per pass. The prefilter
+# is lossless, so both runs must give identical results; any difference is reported.
+#
+# Usage (from the repository root):
+#   python -m benchmarks.PrefilterReport [--databases bundled full] [--repeat 3]
+
+####################################################################
+import argparse
+import json
+import time
+
+from Solution import Solution
+from benchmarks.Benchmark import DATABASES
+
+TEST_FILE = "public.json"
+
+
+def run(data_dir, texts, prefilter, repeat):
+    solution = Solution(data_dir=data_dir, prefilter=prefilter, instrument=True)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        results = [solution.process(text) for text in texts]
+    elapsed = (time.perf_counter() - start) / repeat
+    counters = {name: h["sum"] / repeat for name, h in solution.instrumentation.to_dict()["counters"].items()}
+    return results, elapsed, counters
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Autocorrect calls removed by the noise prefilter")
+    parser.add_argument("--databases", nargs="+", choices=list(DATABASES), default=list(DATABASES))
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with open(TEST_FILE, encoding="utf-8") as f:
+        texts = [item["text"] for item in json.load(f)]
+
+    for name in args.databases:
+        on_results, on_time, on = run(DATABASES[name], texts, True, args.repeat)
+        off_results, off_time, off = run(DATABASES[name], texts, False, args.repeat)
+        attempts = on["autocorrect_calls"] + on["prefiltered"]
+        mismatches = sum(a != b for a, b in zip(on_results, off_results))
+
+        print(f"{name}: {len(texts)} addresses, {attempts:.0f} segments sent to autocorrect")
+        print(f"  prefiltered         {on['prefiltered']:8.0f}  ({on['prefiltered'] / max(attempts, 1):.1%})")
+        for counter in ("autocorrect_calls", "edit_distance_calls", "cosine_scored"):
+            print(f"  {counter:<20}{off[counter]:8.0f} -> {on[counter]:.0f}")
+        print(f"  time per pass       {off_time * 1000:8.1f} -> {on_time * 1000:.1f} ms")
+        print(f"  result mismatches   {mismatches:8d}")
+
+
+if __name__ == "__main__":
+    main()
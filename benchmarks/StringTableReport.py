@@ -0,0 +1,128 @@
+# Memory breakdown of the built index, without and with the string table (StringTable.py)
+# For each gazetteer, builds a Solution from the list files in a fresh process with
+# intern_strings off and on, and reports what tracemalloc holds afterwards, grouped by
+# the function that allocated it, next to a count of the str objects reachable from
+# the index and the gazetteer (all, distinct and the bytes of duplicate copies). The
+# table's own lookup dictionary is dropped once the index is built (StringTable.seal),
+# so the "after" column includes what the table costs.
+#
+# Usage (from the repository root):
+#   python -m benchmarks.StringTableReport [--databases bundled full] [--top 15]
+
+####################################################################
+import argparse
+import ast
+import gc
+import multiprocessing
+import os
+import sys
+import tracemalloc
+from array import array
+from collections import Counter
+from functools import lru_cache
+
+from benchmarks.Benchmark import DATABASES
+
+
+@lru_cache(maxsize=None)
+def function_ranges(filename):
+    """(first line, last line, qualified name) of every function and class in a source file."""
+    try:
+        with open(filename, encoding="utf-8") as file:
+            tree = ast.parse(file.read())
+    except (OSError, SyntaxError, ValueError):
+        return []
+    ranges = []
+
+    def visit(node, prefix):
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                name = prefix + child.name
+                ranges.append((child.lineno, child.end_lineno, name))
+                visit(child, name + ".")
+
+    visit(tree, "")
+    return ranges
+
+
+def allocation_site(frame) -> str:
+    """module.function of a traceback frame, the innermost function containing the line."""
+    module = os.path.splitext(os.path.basename(frame.filename))[0]
+    enclosing = [(last - first, name) for first, last, name in function_ranges(frame.filename)
+                 if first <= frame.lineno <= last]
+    return f"{module}.{min(enclosing)[1]}" if enclosing else f"{module}.<module>"
+
+
+def string_stats(*roots):
+    """(str objects, distinct strings, bytes, bytes of duplicate copies) reachable from roots."""
+    seen, strings = set(), []
+    stack = list(roots)
+    while stack:
+        value = stack.pop()
+        if id(value) in seen:
+            continue
+        seen.add(id(value))
+        if isinstance(value, str):
+            strings.append(value)
+        elif isinstance(value, (int, float, bool, bytes, array, memoryview, type(None))):
+            continue
+        elif isinstance(value, dict) or type(value).__name__ == "mappingproxy":
+            stack.extend(value.keys())
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple, set, frozenset)):
+            stack.extend(value)
+        else:
+            if hasattr(value, "__dict__"):
+                stack.append(vars(value))
+            for slot in getattr(type(value), "__slots__", ()):
+                if hasattr(value, slot):
+                    stack.append(getattr(value, slot))
+    counts = Counter(strings)
+    duplicates = sum((count - 1) * sys.getsizeof(string) for string, count in counts.items())
+    return len(strings), len(counts), sum(sys.getsizeof(string) for string in strings), duplicates
+
+
+def measure(data_dir, intern_strings):
+    """Runs in a fresh process: ({allocation site: bytes}, total bytes, string_stats)."""
+    from Solution import Solution
+    gc.collect()
+    tracemalloc.start()
+    solution = Solution(data_dir=data_dir, snapshot_path=None, intern_strings=intern_strings)
+    gc.collect()
+    snapshot = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    sites = Counter()
+    for statistic in snapshot.statistics("lineno"):
+        sites[allocation_site(statistic.traceback[0])] += statistic.size
+    return dict(sites), sum(sites.values()), string_stats(solution.index, solution.gazetteer)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index memory without and with interned strings")
+    parser.add_argument("--databases", nargs="+", choices=list(DATABASES), default=list(DATABASES))
+    parser.add_argument("--top", type=int, default=15, help="allocation sites listed")
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    for name in args.databases:
+        results = []
+        for intern_strings in (False, True):
+            with context.Pool(1) as pool:
+                results.append(pool.apply(measure, (DATABASES[name], intern_strings)))
+        (before, before_total, before_strings), (after, after_total, after_strings) = results
+
+        print(f"\n== {name} gazetteer ==")
+        print(f"{'allocated by':<52}{'before KB':>11}{'after KB':>11}{'saved KB':>11}")
+        for site in sorted(set(before) | set(after), key=lambda s: -max(before.get(s, 0), after.get(s, 0)))[:args.top]:
+            b, a = before.get(site, 0), after.get(site, 0)
+            print(f"{site:<52}{b / 1024:>11.1f}{a / 1024:>11.1f}{(b - a) / 1024:>11.1f}")
+        print(f"{'total traced':<52}{before_total / 1024:>11.1f}{after_total / 1024:>11.1f}"
+              f"{(before_total - after_total) / 1024:>11.1f}")
+        for label, (objects, distinct, size, duplicates) in (("before", before_strings), ("after", after_strings)):
+            print(f"str objects {label:<7}{objects:>9} objects, {distinct:>9} distinct, {size / 1e6:7.2f} MB, "
+                  f"duplicate copies {duplicates / 1e6:.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
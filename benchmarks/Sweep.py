@@ -0,0 +1,103 @@
+# Accuracy vs latency sweep over the autocorrect tuning constants
+# Every combination of --cosine, --cosine-num and --max-distance is evaluated on
+# public.json in its own process (up to --workers at a time), with a Solution built for
+# that configuration. For each one it reports accuracy per field, overall accuracy and
+# latency percentiles, and marks the configurations on the accuracy/latency Pareto
+# front (no other point is both more accurate and faster at p99).
+#
+# Latencies are only comparable between configurations when --workers does not exceed
+# the number of idle cores.
+#
+# Usage (from the repository root):
+#   python -m benchmarks.Sweep [--cosine 0.65 0.7 0.73 0.8] [--cosine-num 0.8 0.85 0.9]
+#                              [--max-distance 1 2 3] [--workers 4] [--output sweep.json]
+
+####################################################################
+import argparse
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from Autocorrect import COSINE_SIMILARITY_THRESHOLD, COSINE_SIMILARITY_THRESHOLD_NUM, MAX_VALID_EDIT_DISTANCE
+from RunTests import COLUMNS, evaluate, load_test_data
+from Solution import Solution
+from benchmarks.Benchmark import latency_summary
+
+FIELD_COLUMNS = {field: COLUMNS.index(f"{field}_correct") for field in ("province", "district", "ward")}
+
+
+def run_config(config, test_file, repeat):
+    """Accuracy per field and latency of one Solution(**config) on test_file."""
+    data = load_test_data(test_file)
+    solution = Solution(**config)
+
+    times = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        rows, correct, timer = evaluate(solution, data)
+        times += [t / 1_000_000_000 for t in timer]
+    metrics = latency_summary(times, time.perf_counter() - start)
+
+    metrics["config"] = config
+    metrics["accuracy"] = correct / (3 * len(data))
+    for field, column in FIELD_COLUMNS.items():
+        metrics[f"{field}_accuracy"] = sum(row[column] for row in rows) / len(data)
+    return metrics
+
+
+def pareto_front(results, latency_key="p99"):
+    """Indices of results not dominated in (higher accuracy, lower latency)."""
+    front = []
+    for i, a in enumerate(results):
+        dominated = any(b["accuracy"] >= a["accuracy"] and b[latency_key] <= a[latency_key] and
+                        (b["accuracy"] > a["accuracy"] or b[latency_key] < a[latency_key])
+                        for b in results)
+        if not dominated:
+            front.append(i)
+    return front
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep autocorrect constants for accuracy and latency")
+    parser.add_argument("--cosine", nargs="+", type=float, default=[0.65, 0.7, COSINE_SIMILARITY_THRESHOLD, 0.8])
+    parser.add_argument("--cosine-num", nargs="+", type=float, default=[0.8, COSINE_SIMILARITY_THRESHOLD_NUM, 0.9])
+    parser.add_argument("--max-distance", nargs="+", type=int, default=[1, 2, MAX_VALID_EDIT_DISTANCE])
+    parser.add_argument("--test-file", default="public.json")
+    parser.add_argument("--repeat", type=int, default=3, help="passes over the test file per configuration")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--output", help="write all results to this JSON file")
+    args = parser.parse_args()
+
+    configs = [{"cosine_threshold": cosine, "cosine_threshold_num": cosine_num, "max_edit_distance": distance}
+               for cosine, cosine_num, distance in itertools.product(args.cosine, args.cosine_num, args.max_distance)]
+    print(f"{len(configs)} configurations, {args.workers} workers")
+
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        results = list(executor.map(run_config, configs,
+                                    itertools.repeat(args.test_file), itertools.repeat(args.repeat)))
+    front = set(pareto_front(results))
+
+    print(f"{'cosine':>7}{'num':>6}{'dist':>5}{'province':>10}{'district':>10}{'ward':>8}{'total':>8}"
+          f"{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}{'avg ms':>9}")
+    order = sorted(range(len(results)), key=lambda i: (-results[i]["accuracy"], results[i]["p99"]))
+    for i in order:
+        r = results[i]
+        config = r["config"]
+        print(f"{config['cosine_threshold']:>7g}{config['cosine_threshold_num']:>6g}{config['max_edit_distance']:>5}"
+              f"{r['province_accuracy']:>10.4f}{r['district_accuracy']:>10.4f}{r['ward_accuracy']:>8.4f}"
+              f"{r['accuracy']:>8.4f}" +
+              "".join(f"{r[key] * 1000:>9.3f}" for key in ("p50", "p90", "p99", "max", "avg")) +
+              ("  *" if i in front else ""))
+    print("* accuracy/p99 Pareto front")
+
+    if args.output:
+        for i, r in enumerate(results):
+            r["pareto"] = i in front
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# Province lookup: right-to-left tail match vs the full Aho-Corasick scan
+# For the normalized public.json addresses, times Searcher.search_tail (with its
+# fallback to search_part) against search_part alone on the province trie, and counts
+# how often the tail match answers without falling back and what those answers cost.
+# The run is repeated with --pad extra leading segments: the cost of tail hits does
+# not grow with the address.
+#
+# Usage (from the repository root):
+#   python -m benchmarks.TailMatchBenchmark [--pad 0 5 20] [--repeat 20]
+
+####################################################################
+import argparse
+import json
+import time
+
+from Searcher import search_part, search_tail
+from Solution import Solution
+from Utils import normalize_text_but_keep_accent, segment_text
+
+TEST_FILE = "public.json"
+PADDING_SEGMENT = "sốnhà12ngõ5đườnglêlợi"
+
+
+def time_per_call(function, texts, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            function(text)
+    return (time.perf_counter() - start) / (repeat * len(texts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tail-anchored province match vs full scan")
+    parser.add_argument("--pad", nargs="+", type=int, default=[0, 5, 20], help="leading segments added")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    solution = Solution()
+    trie = solution.tries["province"]
+    with open(TEST_FILE, encoding="utf-8") as f:
+        texts = [normalize_text_but_keep_accent(",".join(segment_text(item["text"]))) for item in json.load(f)]
+
+    def tail(text):
+        match = search_tail(trie, text)
+        return match if match is not None else search_part(trie, text, True)
+
+    def scan(text):
+        return search_part(trie, text, True)
+
+    print(f"{'pad':>4}{'avg chars':>11}{'tail us':>9}{'scan us':>9}{'tail hits':>11}{'hit us':>8}")
+    for pad in args.pad:
+        padded = [",".join([PADDING_SEGMENT] * pad + [text]) for text in texts]
+        hits = [text for text in padded if search_tail(trie, text) is not None]
+        print(f"{pad:>4}{sum(map(len, padded)) / len(padded):>11.0f}"
+              f"{time_per_call(tail, padded, args.repeat) * 1e6:>9.2f}"
+              f"{time_per_call(scan, padded, args.repeat) * 1e6:>9.2f}"
+              f"{len(hits) / len(padded):>11.1%}"
+              f"{time_per_call(tail, hits, args.repeat) * 1e6:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
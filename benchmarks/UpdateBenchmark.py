@@ -0,0 +1,106 @@
+# Live gazetteer updates (Solution.apply_changes / reload, see LiveIndex.py)
+# For each database, times single-name updates (the first one of a category also builds
+# its bookkeeping), a reload that applies a file diff of --changes wards, and a full
+# Solution rebuild for comparison. Meanwhile --readers threads keep classifying an
+# address naming the ward being renamed back and forth; every answer must be the one
+# of the old or of the new version of the index, which is checked and reported.
+#
+# Usage (from the repository root):
+#   python -m benchmarks.UpdateBenchmark [--databases bundled full] [--changes 200] [--readers 2]
+
+####################################################################
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+from LiveIndex import read_names
+from Solution import Solution
+from benchmarks.Benchmark import DATABASES
+
+RENAME_SUFFIX = " Mới"
+
+
+def reader(solution, address, valid, stop, counts):
+    while not stop.is_set():
+        ward = solution.process(address)["ward"]
+        counts["calls"] += 1
+        if ward not in valid:
+            counts["inconsistent"] += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency of incremental gazetteer updates")
+    parser.add_argument("--databases", nargs="+", choices=list(DATABASES), default=list(DATABASES))
+    parser.add_argument("--changes", type=int, default=200, help="wards removed and renamed by the reload")
+    parser.add_argument("--renames", type=int, default=50, help="single renames timed")
+    parser.add_argument("--readers", type=int, default=2)
+    args = parser.parse_args()
+    rng = random.Random(0)
+
+    for name in args.databases:
+        start = time.perf_counter()
+        solution = Solution(data_dir=DATABASES[name], snapshot_path=None)
+        full_build = time.perf_counter() - start
+        names = read_names(solution.filenames["ward"])
+        ward = rng.choice(sorted(set(names)))
+        renamed = ward + RENAME_SUFFIX
+
+        start = time.perf_counter()
+        solution.add_location("ward", "Tân Thịnh Vượng")
+        first_update = time.perf_counter() - start
+
+        # The answers of both versions, by renaming once there and back
+        address = f"{renamed}, {names[0]}"
+        valid = {solution.process(address)["ward"]}
+        solution.rename_location("ward", ward, renamed)
+        valid.add(solution.process(address)["ward"])
+        solution.rename_location("ward", renamed, ward)
+
+        stop = threading.Event()
+        counts = {"calls": 0, "inconsistent": 0}
+        threads = [threading.Thread(target=reader, args=(solution, address, valid, stop, counts))
+                   for _ in range(args.readers)]
+        for thread in threads:
+            thread.start()
+        times = []
+        for i in range(args.renames):
+            old, new = (ward, renamed) if i % 2 == 0 else (renamed, ward)
+            start = time.perf_counter()
+            solution.rename_location("ward", old, new)
+            times.append(time.perf_counter() - start)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        times.sort()
+
+        # A list file with --changes wards removed and as many renamed
+        changes = min(args.changes, len(set(names)) // 4)
+        changed = rng.sample(sorted(set(names)), 2 * changes)
+        removed, edited = set(changed[:changes]), set(changed[changes:])
+        lines = [n + RENAME_SUFFIX if n in edited else n for n in names if n not in removed]
+        with tempfile.NamedTemporaryFile("w", encoding="utf-8", suffix=".txt", delete=False) as file:
+            file.write("\n".join(lines) + "\n")
+        try:
+            start = time.perf_counter()
+            solution.reload("ward", file.name)
+            reload_time = time.perf_counter() - start
+        finally:
+            os.unlink(file.name)
+        start = time.perf_counter()
+        solution.rebuild_index("ward")
+        rebuild_time = time.perf_counter() - start
+
+        print(f"{name}: {len(names)} wards, version {solution.index.version}")
+        print(f"  new Solution (no snapshot)   {full_build * 1000:9.1f} ms")
+        print(f"  first update (bookkeeping)   {first_update * 1000:9.1f} ms")
+        print(f"  rename p50 / max             {times[len(times) // 2] * 1000:9.1f} / {times[-1] * 1000:.1f} ms")
+        print(f"  reload, {2 * changes:4d} names changed   {reload_time * 1000:9.1f} ms")
+        print(f"  rebuild of the ward index    {rebuild_time * 1000:9.1f} ms")
+        print(f"  reader calls during renames  {counts['calls']:9d}, inconsistent {counts['inconsistent']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+# Shared fixtures; run the tests from the repository root with `python -m pytest tests`
+
+####################################################################
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from RunTests import load_test_data  # noqa: E402
+from Solution import Solution  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def solution():
+    """Solution built from the bundled list files, shared by the tests that only read it."""
+    return Solution(snapshot_path=None)
+
+
+@pytest.fixture(scope="session")
+def addresses():
+    return [item["text"] for item in load_test_data()]
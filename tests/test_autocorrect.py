@@ -0,0 +1,34 @@
+# Autocorrect.find_closest_words (SymSpell deletion index) against a linear scan of every word
+
+####################################################################
+import unicodedata
+
+import editdistance
+
+from Autocorrect import MAX_VALID_EDIT_DISTANCE, find_closest_words
+from Utils import normalize_text_but_keep_accent, segment_text
+
+
+def find_closest_words_scan(word_normalized, trie, max_distance=MAX_VALID_EDIT_DISTANCE):
+    """The linear scan over trie.all_words that find_closest_words replaced."""
+    best_distance = float("inf")
+    matches = []
+    temp = unicodedata.normalize("NFKD", word_normalized)
+
+    for candidate_normalized in trie.all_words:
+        distance = editdistance.distance(temp, unicodedata.normalize("NFKD", candidate_normalized))
+        if distance < min(best_distance, max_distance):
+            matches = [candidate_normalized]
+            best_distance = distance
+        elif distance == min(best_distance, max_distance):
+            matches.append(candidate_normalized)
+    return matches
+
+
+def test_find_closest_words_matches_scan(solution, addresses):
+    segments = sorted({segment for address in addresses
+                       for segment in normalize_text_but_keep_accent(",".join(segment_text(address))).split(",")})
+    for category, trie in solution.tries.items():
+        for segment in segments:
+            assert sorted(find_closest_words(segment, trie)) == sorted(find_closest_words_scan(segment, trie)), \
+                (category, segment)
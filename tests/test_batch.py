@@ -0,0 +1,58 @@
+# Solution.process_batch with forked workers, including two instances batching at once
+
+####################################################################
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from Solution import PARENT_CHECK_INTERVAL, Solution
+
+pytestmark = pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="needs fork")
+
+
+def test_process_batch_matches_process(solution, addresses):
+    assert solution.process_batch(addresses, workers=2, chunksize=16) == [solution.process(s) for s in addresses]
+
+
+def test_concurrent_batches_use_their_own_instance(solution, addresses):
+    # Same lists minus one province: its addresses are answered differently
+    other = Solution(snapshot_path=None)
+    other.remove_location("province", "Hồ Chí Minh")
+    expected = {s: [s.process(a) for a in addresses] for s in (solution, other)}
+    assert expected[solution] != expected[other]
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        runs = [(s, executor.submit(s.process_batch, addresses, 2, 8)) for s in (solution, other, solution, other)]
+        for s, future in runs:
+            assert future.result() == expected[s]
+
+
+def running(pid):
+    try:
+        with open(f"/proc/{pid}/stat") as file:
+            return file.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except FileNotFoundError:
+        return False
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc"), reason="needs /proc")
+def test_workers_exit_with_their_parent():
+    parent = subprocess.Popen([sys.executable, "-c", (
+        "import multiprocessing, time\n"
+        "from Solution import fork_executor\n"
+        "executor = fork_executor(None, 2)\n"
+        "print(*[child.pid for child in multiprocessing.active_children()], flush=True)\n"
+        "time.sleep(60)\n")], stdout=subprocess.PIPE, text=True)
+    workers = [int(pid) for pid in parent.stdout.readline().split()]
+    assert len(workers) == 2
+    parent.kill()
+    parent.wait()
+    deadline = time.monotonic() + 10 * PARENT_CHECK_INTERVAL
+    while any(running(pid) for pid in workers) and time.monotonic() < deadline:
+        time.sleep(0.1)
+    assert not any(running(pid) for pid in workers)
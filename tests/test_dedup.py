@@ -0,0 +1,21 @@
+# Solution.process_deduplicated against a process loop
+
+####################################################################
+from Solution import Solution
+
+
+def test_matches_process(solution, addresses):
+    batch = addresses + addresses[::-1]
+    assert solution.process_deduplicated(batch) == [solution.process(s) for s in batch]
+
+
+def test_duplicates_get_independent_results():
+    solution = Solution(snapshot_path=None, budget=1.0)
+    address = "Xã Tân Hòa, Huyện Châu Thành, Tiền Giang"
+    first, second = solution.process_deduplicated([address, address])
+    assert first == second and first["resolved"] == ["province", "district", "ward"]
+
+    first["ward"] = ""
+    first["resolved"].remove("ward")
+    first["cut_off"].append("ward")
+    assert second == solution.process(address)
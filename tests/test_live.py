@@ -0,0 +1,70 @@
+# Live gazetteer updates (LiveIndex.py): an updated Solution answers like one built from the new lists
+
+####################################################################
+import os
+
+import pytest
+
+from LiveIndex import read_names
+from Solution import Solution
+
+CHANGES = {
+    # "Hòa Quý" shares its variants with "Hoà Quý", which comes earlier in the file
+    "ward": {"removed": ["Hòa Thạnh", "Minh Hòa"], "added": ["Hòa Quý", "Tân Thịnh Vượng"]},
+    "district": {"removed": ["Hoài Nhơn"], "added": ["Tân Thịnh Vượng"]},
+    "province": {"removed": ["Bình Định"], "added": ["Tân Thịnh Vượng"]},
+}
+
+
+def write_changed_lists(solution, directory):
+    for category, change in CHANGES.items():
+        names = [name for name in read_names(solution.filenames[category]) if name not in change["removed"]]
+        with open(os.path.join(directory, f"list_{category}.txt"), "w", encoding="utf-8") as file:
+            file.write("\n".join(names + change["added"]) + "\n")
+
+
+@pytest.mark.parametrize("options", [{}, {"engine": "lattice"}, {"engine": "lattice", "compact": True},
+                                     {"lazy": True}, {"lazy": True, "compact": True}],
+                         ids=["cascade", "lattice", "lattice compact", "lazy", "lazy compact"])
+def test_updates_match_a_fresh_build(tmp_path, addresses, options):
+    solution = Solution(snapshot_path=None, **options)
+    for category, change in CHANGES.items():
+        solution.apply_changes(category, added=change["added"], removed=change["removed"])
+    write_changed_lists(solution, tmp_path)
+    fresh = Solution(data_dir=str(tmp_path), snapshot_path=None, **options)
+
+    texts = addresses + [f"{text}, {name}" for text in addresses[:50] for name in ("Tân Thịnh Vượng", "tan thinh vuong")]
+    texts.append("Phường Hòa Quý, Quận Ngũ Hành Sơn, Đà Nẵng")
+    assert [solution.process(text) for text in texts] == [fresh.process(text) for text in texts]
+    assert solution.process(texts[-1])["ward"] == "Hòa Quý"  # the name loaded last
+
+
+def test_lattice_update_keeps_the_automaton():
+    solution = Solution(snapshot_path=None, engine="lattice")
+    automaton = solution.lattice.trie
+    solution.add_location("ward", "Tân Thịnh Vượng")
+    assert solution.lattice.trie is automaton
+    assert solution.process("Tân Thịnh Vượng, Hồ Chí Minh")["ward"] == "Tân Thịnh Vượng"
+
+    solution.rebuild_index("ward")
+    assert solution.lattice.trie is not automaton
+    assert solution.process("Tân Thịnh Vượng, Hồ Chí Minh")["ward"] == "Tân Thịnh Vượng"
+
+
+def test_lazy_update_before_any_autocorrect():
+    solution = Solution(snapshot_path=None, lazy=True)
+    solution.add_location("ward", "Zzyzx")
+    assert solution.process("Zzyzx, Quận 1, Hồ Chí Minh")["ward"] == "Zzyzx"
+    assert solution.process("Zzyzz, Quận 1, Hồ Chí Minh")["ward"] == "Zzyzx"  # through autocorrect
+
+
+def test_updates_rejected_with_a_hierarchy(tmp_path):
+    hierarchy = tmp_path / "hierarchy.tsv"
+    hierarchy.write_text("Hồ Chí Minh\tQuận 1\tBến Nghé\n", encoding="utf-8")
+    solution = Solution(snapshot_path=None, hierarchy_path=str(hierarchy))
+    with pytest.raises(ValueError):
+        solution.remove_location("ward", "Bến Nghé")
+    with pytest.raises(ValueError):
+        solution.reload("ward")
+    assert solution.index.version == 0
+    assert solution.process("Bến Nghé, Quận 1, Hồ Chí Minh")["ward"] == "Bến Nghé"
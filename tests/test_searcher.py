@@ -0,0 +1,23 @@
+# Searcher.search_part (one Aho-Corasick pass) against the start-by-start scan it replaced
+
+####################################################################
+from Searcher import search_part
+from Utils import normalize_text_but_keep_accent, segment_text
+
+
+def search_part_scan(trie, input_text, reversed=False):
+    """The scan search_part replaced: Trie.search_max_length from each start in turn (reversed: from the end)."""
+    starts = range(len(input_text))
+    for i in reversed and starts[::-1] or starts:
+        matches = trie.search_max_length(input_text, i)
+        if matches:
+            return max(matches, key=lambda x: (x[2], x[2] - x[1]))  # Prioritize the end and length
+    return "", None, None
+
+
+def test_search_part_matches_scan(solution, addresses):
+    texts = [normalize_text_but_keep_accent(",".join(segment_text(address))) for address in addresses]
+    for category, trie in solution.tries.items():
+        for reverse in (False, True):
+            for text in texts:
+                assert search_part(trie, text, reverse) == search_part_scan(trie, text, reverse), (category, text)
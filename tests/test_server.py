@@ -0,0 +1,75 @@
+# Server.ClassificationServer: request handling within one micro-batch
+
+####################################################################
+import asyncio
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from Server import ClassificationServer
+
+
+class RecordingWriter:
+    """Stands in for asyncio.StreamWriter and keeps the responses written to it."""
+
+    def __init__(self):
+        self.responses = []
+
+    def write(self, data: bytes):
+        self.responses.append(json.loads(data))
+
+    async def drain(self):
+        pass
+
+
+def test_invalid_requests_do_not_fail_their_batch(solution):
+    requests = [
+        {"id": 1, "text": "Phường 3, Quận 5, Hồ Chí Minh"},
+        {"id": 2, "text": 5},
+        {"id": 3, "text": "Xã Tân Hòa, Huyện Châu Thành, Tiền Giang"},
+        {"id": 4},
+        {"id": 5, "text": None},
+    ]
+
+    async def run():
+        # A wide window so that every valid request lands in the same batch
+        server = ClassificationServer(solution, window=0.05)
+        batcher = asyncio.create_task(server.batcher())
+        writer = RecordingWriter()
+        try:
+            await asyncio.gather(*(server.handle_request(json.dumps(request).encode(), writer)
+                                   for request in requests))
+        finally:
+            batcher.cancel()
+            server.executor.shutdown()
+        return server, writer.responses
+
+    server, responses = asyncio.run(run())
+    by_id = {response["id"]: response for response in responses}
+    for request in requests:
+        if isinstance(request.get("text"), str):
+            assert by_id[request["id"]]["result"] == solution.process(request["text"])
+        else:
+            assert "result" not in by_id[request["id"]]
+            assert by_id[request["id"]]["error"].startswith("ValueError")
+    assert server.metrics.errors == 3
+    assert server.metrics.batches == 1
+
+
+@pytest.mark.skipif(not os.path.exists(f"/proc/{os.getpid()}/task/{os.getpid()}/children"), reason="needs /proc children")
+def test_sigterm_shuts_down_server_and_workers(tmp_path):
+    server = subprocess.Popen([sys.executable, "Server.py", "--unix", str(tmp_path / "server.sock"), "--workers", "2"],
+                              stdout=subprocess.PIPE, text=True)
+    for line in server.stdout:  # wait until it listens
+        if line.startswith("Serving on"):
+            break
+    with open(f"/proc/{server.pid}/task/{server.pid}/children") as file:
+        workers = [int(pid) for pid in file.read().split()]
+    assert len(workers) == 2
+
+    server.terminate()
+    assert server.wait(timeout=10) == 0  # returned from serve() instead of dying on the signal
+    assert not any(os.path.exists(f"/proc/{pid}") for pid in workers)
@@ -0,0 +1,55 @@
+# Snapshot.load_snapshot: valid, stale and corrupt snapshot files
+
+####################################################################
+import pytest
+
+from Snapshot import build_snapshot, load_snapshot
+from Solution import Solution
+
+FILENAMES = {"province": "list_province.txt", "district": "list_district.txt", "ward": "list_ward.txt"}
+
+
+@pytest.fixture(scope="module")
+def snapshot_bytes(tmp_path_factory):
+    path = tmp_path_factory.mktemp("snapshot") / "index.snapshot"
+    build_snapshot(FILENAMES, str(path))
+    return path.read_bytes()
+
+
+def test_valid_snapshot_loads(tmp_path, snapshot_bytes):
+    path = tmp_path / "index.snapshot"
+    path.write_bytes(snapshot_bytes)
+    tries = {}
+    assert load_snapshot(str(path), FILENAMES, tries)
+    assert set(tries) == set(FILENAMES)
+
+
+def test_stale_snapshot_is_ignored(tmp_path, snapshot_bytes):
+    path = tmp_path / "index.snapshot"
+    path.write_bytes(snapshot_bytes)
+    other = dict(FILENAMES, ward="vietnamese-provinces-database/list_ward.txt")
+    tries = {}
+    assert not load_snapshot(str(path), other, tries)
+    assert tries == {}
+
+
+@pytest.mark.parametrize("corrupt", [
+    lambda data: b"",
+    lambda data: data[:len(data) // 2],
+    lambda data: data[:-1],
+    lambda data: data[:40],
+    lambda data: b"\x00garbage" * 1000,
+    lambda data: data[:12] + b"{not json" + data[21:],
+    lambda data: data[:len(data) // 2] + bytes(len(data) - len(data) // 2),
+], ids=["empty", "truncated", "last byte missing", "truncated header", "garbage", "garbage header",
+        "zeroed payload"])
+def test_corrupt_snapshot_is_rebuilt(tmp_path, snapshot_bytes, solution, corrupt):
+    path = tmp_path / "index.snapshot"
+    path.write_bytes(corrupt(snapshot_bytes))
+    tries = {}
+    assert not load_snapshot(str(path), FILENAMES, tries)
+    assert tries == {}
+
+    rebuilt = Solution(snapshot_path=str(path))
+    address = "Phường 3, Quận 5, Hồ Chí Minh"
+    assert rebuilt.process(address) == solution.process(address)
@@ -0,0 +1,15 @@
+# StringTable: the lookup dictionary is dropped once the index is built
+
+####################################################################
+import pytest
+
+from Solution import Solution
+
+
+@pytest.mark.parametrize("compact", [False, True], ids=["trie", "compact"])
+def test_table_sealed_after_lazy_build(compact):
+    solution = Solution(snapshot_path=None, lazy=True, compact=compact)
+    assert solution.strings._ids is None
+    assert solution.process("Xã Tân Hòa, Huyện Châu Thành, Tiền Giang")["ward"] == "Tân Hòa"
+    assert solution.tries["ward"].loaded
+    assert solution.strings._ids is None